@@ -6,8 +6,12 @@ import numpy as np
 from scipy import stats
 from scipy.stats._unuran.unuran_wrapper import rv_frozen
 
+from lab2.services.kernel_density import BinnedKernelDensityEstimator
+
 
 class StatisticalAnalysisService:
+    MAX_DISCRETE_TICKS = 30
+
     @staticmethod
     def calculate_descriptive_stats(sample: list[float | int]) -> dict:
         sample_array = np.array(sample)
@@ -55,30 +59,43 @@ class StatisticalAnalysisService:
             sample: list[float | int],
             is_continuous: bool = True,
             bins: int | None = None,
-            title: str = "Histogram"
+            title: str = "Histogram",
+            kde: bool = False
     ) -> str:
-        plt.figure(figsize=(8, 6))
+        fig, ax = plt.subplots(figsize=(8, 6))
         sample_array = np.array(sample)
 
         if is_continuous:
             if bins is None:
                 bins = int(np.ceil(np.log2(len(sample_array)) + 1))
-            plt.hist(sample_array, bins=bins, density=True, alpha=0.7, color='skyblue', edgecolor='black')
-            plt.ylabel('Density')
+            ax.hist(sample_array, bins=bins, density=True, alpha=0.7, color='skyblue', edgecolor='black')
+            ax.set_ylabel('Density')
+            if kde:
+                grid, density = BinnedKernelDensityEstimator.estimate_1d(sample_array)
+                ax.plot(grid, density, color='darkblue', linewidth=2, label='KDE')
+                ax.legend()
         else:
             unique_vals, counts = np.unique(sample_array, return_counts=True)
             freqs = counts / len(sample_array)
-            plt.bar(unique_vals, freqs, alpha=0.7, color='lightcoral', edgecolor='black')
-            plt.ylabel('Relative Frequency')
-            plt.xticks(unique_vals)
-
-        plt.xlabel('Values')
-        plt.title(title)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
+            ax.bar(unique_vals, freqs, alpha=0.7, color='lightcoral', edgecolor='black')
+            ax.set_ylabel('Relative Frequency')
+            if len(unique_vals) <= StatisticalAnalysisService.MAX_DISCRETE_TICKS:
+                ax.set_xticks(unique_vals)
+            if kde and np.issubdtype(sample_array.dtype, np.number):
+                grid, density = BinnedKernelDensityEstimator.estimate_1d(sample_array)
+                kde_ax = ax.twinx()
+                kde_ax.plot(grid, density, color='darkblue', linewidth=2, label='KDE')
+                kde_ax.set_ylabel('KDE Density')
+                kde_ax.set_ylim(bottom=0)
+                kde_ax.legend(loc='upper right')
+
+        ax.set_xlabel('Values')
+        ax.set_title(title)
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
 
         buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
+        fig.savefig(buf, format='png')
+        plt.close(fig)
         buf.seek(0)
 
         image_base64 = base64.b64encode(buf.read()).decode('utf-8')
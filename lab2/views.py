@@ -39,7 +39,8 @@ class Lab2View(TemplateView):
                     histogram_base64 = StatisticalAnalysisService.plot_histogram(
                         sample,
                         is_continuous=True,
-                        title=f"Histogram of {form.cleaned_data['distribution']} sample"
+                        title=f"Histogram of {form.cleaned_data['distribution']} sample",
+                        kde=True
                     )
 
                     ks_test_result = StatisticalAnalysisService.test_distribution_fit(
@@ -91,7 +92,8 @@ class Lab2View(TemplateView):
                     )
                     chart_base64 = StatisticalAnalysisService.plot_histogram(
                         sample_for_plotting, is_continuous=False,
-                        title=f"Frequency Chart for custom discrete distribution"
+                        title=f"Frequency Chart for custom discrete distribution",
+                        kde=True
                     )
 
                     expected_dist_dict = dict(zip(values_list, probabilities_list))
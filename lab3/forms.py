@@ -1,5 +1,7 @@
 from django import forms
 
+from lab3.services.sparse_distribution_table import SparseDistributionTable
+
 
 class Task1Form(forms.Form):
     sample_size = forms.IntegerField(
@@ -26,10 +28,26 @@ class Task1Form(forms.Form):
         help_text="Check to generate a 3D visualization (⚠️ may take longer)."
     )
 
+    SAMPLING_CHOICES = [
+        ('rejection', 'Rejection (bounding box)'),
+        ('gibbs', 'Metropolis-within-Gibbs (parallel chains)'),
+    ]
+
+    sampling_method = forms.ChoiceField(
+        label="Sampling Method",
+        choices=SAMPLING_CHOICES,
+        initial='rejection',
+        required=False,
+        help_text="Gibbs runs several MCMC chains in worker processes and reports ESS and R-hat."
+    )
+
     def clean_confidence_level(self):
         cl = self.cleaned_data.get('confidence_level')
         return cl if cl is not None else 0.95
 
+    def clean_sampling_method(self):
+        return self.cleaned_data.get('sampling_method') or 'rejection'
+
 
 class Task2Form(forms.Form):
     distribution_matrix = forms.CharField(
@@ -43,7 +61,15 @@ class Task2Form(forms.Form):
         2,1,0.3
         2,2,0.4
         """,
-        initial="1,1,0.1\n1,2,0.2\n2,1,0.3\n2,2,0.4"
+        initial="1,1,0.1\n1,2,0.2\n2,1,0.3\n2,2,0.4",
+        required=False
+    )
+
+    distribution_file = forms.FileField(
+        label="Distribution File",
+        required=False,
+        help_text="Optional .csv (x,y,probability rows) or .npz (arrays x, y, p) file. "
+                  "Takes precedence over the matrix above; use it for large sparse distributions."
     )
 
     sample_size = forms.IntegerField(
@@ -75,7 +101,7 @@ class Task2Form(forms.Form):
         lines = data.strip().splitlines()
 
         if not lines:
-            raise forms.ValidationError("Matrix cannot be empty.")
+            return None
 
         for i, line in enumerate(lines, 1):
             parts = line.split(',')
@@ -107,3 +133,20 @@ class Task2Form(forms.Form):
     def clean_confidence_level(self):
         cl = self.cleaned_data.get('confidence_level')
         return cl if cl is not None else 0.95
+
+    def clean(self):
+        cleaned_data = super().clean()
+        uploaded = cleaned_data.get('distribution_file')
+        matrix = cleaned_data.get('distribution_matrix')
+
+        try:
+            if uploaded:
+                cleaned_data['distribution_table'] = SparseDistributionTable.from_upload(uploaded)
+            elif matrix:
+                cleaned_data['distribution_table'] = SparseDistributionTable.from_dict(matrix)
+            elif 'distribution_matrix' not in self.errors:
+                raise forms.ValidationError("Enter a distribution matrix or upload a distribution file.")
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+
+        return cleaned_data
@@ -0,0 +1,87 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class BivariateMomentAccumulator:
+    n: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0
+    m2_y: float = 0.0
+    c_xy: float = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y) -> "BivariateMomentAccumulator":
+        return cls().update(x, y)
+
+    def update(self, x, y) -> "BivariateMomentAccumulator":
+        x_arr = np.asarray(x, dtype=float).ravel()
+        y_arr = np.asarray(y, dtype=float).ravel()
+        if x_arr.size != y_arr.size:
+            raise ValueError("x and y must have the same length.")
+        if x_arr.size == 0:
+            return self
+
+        mean_x = float(x_arr.mean())
+        mean_y = float(y_arr.mean())
+        dx = x_arr - mean_x
+        dy = y_arr - mean_y
+        chunk = BivariateMomentAccumulator(
+            n=int(x_arr.size),
+            mean_x=mean_x,
+            mean_y=mean_y,
+            m2_x=float(dx @ dx),
+            m2_y=float(dy @ dy),
+            c_xy=float(dx @ dy),
+        )
+        return self.merge(chunk)
+
+    def merge(self, other: "BivariateMomentAccumulator") -> "BivariateMomentAccumulator":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean_x, self.mean_y = other.n, other.mean_x, other.mean_y
+            self.m2_x, self.m2_y, self.c_xy = other.m2_x, other.m2_y, other.c_xy
+            return self
+
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.m2_y += other.m2_y + dy * dy * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.n = n
+        return self
+
+    @property
+    def variance_x(self) -> float:
+        return self.m2_x / (self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def variance_y(self) -> float:
+        return self.m2_y / (self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def covariance(self) -> float:
+        return self.c_xy / (self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def correlation(self) -> float:
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return 0.0
+        r = self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+        return max(-1.0, min(1.0, r))
+
+    @property
+    def t_statistic(self) -> float | None:
+        if self.n < 3:
+            return None
+        r = self.correlation
+        return r * math.sqrt((self.n - 2) / (1 - r ** 2)) if abs(r) < 1 else float('inf')
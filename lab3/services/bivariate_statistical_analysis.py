@@ -1,16 +1,23 @@
 import base64
 import io
-from collections import Counter
 from typing import Any
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.colors import LogNorm
 from scipy import stats
 
+from lab2.services.kernel_density import BinnedKernelDensityEstimator
 from lab2.services.statistical_analysis import StatisticalAnalysisService as BaseSAS
+from lab3.services.bivariate_moment_accumulator import BivariateMomentAccumulator
+from lab3.services.sparse_distribution_table import SparseDistributionTable
 
 
 class BivariateStatisticalAnalysisService(BaseSAS):
+    MAX_3D_BINS = 25
+    HEATMAP_BINS = 120
+    CONTOUR_LEVELS = 8
+
     @staticmethod
     def separate_components(sample: list[tuple[float, float]]) -> tuple[list[float], list[float]]:
         x_list = []
@@ -20,24 +27,26 @@ class BivariateStatisticalAnalysisService(BaseSAS):
             y_list += [y]
         return x_list, y_list
 
+    @staticmethod
+    def calculate_moments(x: list[float], y: list[float]) -> BivariateMomentAccumulator:
+        return BivariateMomentAccumulator.from_arrays(x, y)
+
     @staticmethod
     def calculate_covariance(x: list[float], y: list[float]) -> float:
-        x_arr = np.array(x)
-        y_arr = np.array(y)
-        return float(np.cov(x_arr, y_arr, ddof=1)[0, 1])
+        return BivariateStatisticalAnalysisService.calculate_moments(x, y).covariance
 
     @staticmethod
     def calculate_correlation(x: list[float], y: list[float]) -> float:
-        if len(x) < 2:
-            return 0.0
-        x_arr = np.array(x)
-        y_arr = np.array(y)
-        corr = np.corrcoef(x_arr, y_arr)[0, 1]
-        return float(corr) if not np.isnan(corr) else 0.0
+        return BivariateStatisticalAnalysisService.calculate_moments(x, y).correlation
 
     @staticmethod
     def test_independence_pearson(x: list[float], y: list[float], alpha: float = 0.05) -> dict[str, Any]:
-        n = len(x)
+        moments = BivariateStatisticalAnalysisService.calculate_moments(x, y)
+        return BivariateStatisticalAnalysisService.test_independence_from_moments(moments, alpha)
+
+    @staticmethod
+    def test_independence_from_moments(moments: BivariateMomentAccumulator, alpha: float = 0.05) -> dict[str, Any]:
+        n = moments.n
         if n < 3:
             return {
                 'test_name': 'Pearson Correlation t-test',
@@ -48,8 +57,8 @@ class BivariateStatisticalAnalysisService(BaseSAS):
                 'interpretation': "There is not enough data for the test."
             }
 
-        r = BivariateStatisticalAnalysisService.calculate_correlation(x, y)
-        t_stat = r * np.sqrt((n - 2) / (1 - r ** 2)) if abs(r) < 1 else float('inf')
+        r = moments.correlation
+        t_stat = moments.t_statistic
         p_value = 2 * (1 - stats.t.cdf(abs(t_stat), df=n - 2))
 
         return {
@@ -69,7 +78,8 @@ class BivariateStatisticalAnalysisService(BaseSAS):
             density_func_x=None,
             density_func_y=None,
             title_x: str = "Histogram X",
-            title_y: str = "Histogram Y"
+            title_y: str = "Histogram Y",
+            kde: bool = False
     ) -> tuple[str, str]:
         x_vals, y_vals = BivariateStatisticalAnalysisService.separate_components(sample)
 
@@ -92,6 +102,10 @@ class BivariateStatisticalAnalysisService(BaseSAS):
                 y_density = [density_func(x) for x in x_range]
                 plt.plot(x_range, y_density, 'r-', linewidth=2, label='Theoretical Density')
 
+            if kde:
+                grid, density = BinnedKernelDensityEstimator.estimate_1d(val_array)
+                plt.plot(grid, density, color='darkblue', linestyle='--', linewidth=2, label='KDE')
+
             plt.xlabel('Values')
             plt.ylabel('Density')
             plt.title(title)
@@ -123,7 +137,7 @@ class BivariateStatisticalAnalysisService(BaseSAS):
         fig = plt.figure(figsize=(12, 8))
         ax = fig.add_subplot(111, projection='3d')
 
-        n_bins = int(np.ceil(np.power(len(sample), 1/3)))
+        n_bins = min(int(np.ceil(np.power(len(sample), 1/3))), BivariateStatisticalAnalysisService.MAX_3D_BINS)
         hist, x_edges, y_edges = np.histogram2d(x_vals, y_vals, bins=n_bins, density=True)
 
         x_centers = (x_edges[:-1] + x_edges[1:]) / 2
@@ -139,7 +153,9 @@ class BivariateStatisticalAnalysisService(BaseSAS):
             x_surf = np.linspace(x_vals.min(), x_vals.max(), 50)
             y_surf = np.linspace(y_vals.min(), y_vals.max(), 50)
             x_data_value, y_data_value = np.meshgrid(x_surf, y_surf)
-            z_data_value = np.array([[density_func(x, y) for x in x_surf] for y in y_surf])
+            z_data_value = BivariateStatisticalAnalysisService._evaluate_density_grid(
+                density_func, x_data_value, y_data_value
+            )
 
             ax.plot_surface(X=x_data_value, Y=y_data_value, Z=z_data_value, color='red', alpha=0.3, linewidth=0)
 
@@ -155,29 +171,141 @@ class BivariateStatisticalAnalysisService(BaseSAS):
         return base64.b64encode(buf.read()).decode('utf-8')
 
     @staticmethod
-    def plot_discrete_3d_histogram(
-        sample: list[tuple[Any, Any]],
-        theoretical_prob_matrix: dict[tuple[Any, Any], float],
-        title: str = "3D Histogram: Observed vs Theoretical"
+    def _evaluate_density_grid(density_func, x_mesh: np.ndarray, y_mesh: np.ndarray) -> np.ndarray:
+        try:
+            z = np.asarray(density_func(x_mesh, y_mesh), dtype=float)
+            if z.shape == x_mesh.shape:
+                return z
+        except (TypeError, ValueError):
+            pass
+        return np.vectorize(density_func, otypes=[float])(x_mesh, y_mesh)
+
+    @staticmethod
+    def _padded_range(values: np.ndarray) -> tuple[float, float]:
+        # a constant component is widened by ±0.5 as np.histogram2d does, so the KDE grid has a non-zero step
+        lo, hi = float(values.min()), float(values.max())
+        return (lo - 0.5, hi + 0.5) if lo == hi else (lo, hi)
+
+    @staticmethod
+    def plot_density_heatmap(
+            sample: list[tuple[float, float]],
+            density_func=None,
+            title: str = "Sample Density Heatmap",
+            bins: int | None = None,
+            kde: bool = False
     ) -> str:
-        sample_counter = Counter(sample)
-        n = len(sample)
+        pairs = np.asarray(sample, dtype=float).reshape(-1, 2)
+        bins = bins or BivariateStatisticalAnalysisService.HEATMAP_BINS
+
+        x_range = BivariateStatisticalAnalysisService._padded_range(pairs[:, 0])
+        y_range = BivariateStatisticalAnalysisService._padded_range(pairs[:, 1])
+        hist, x_edges, y_edges = np.histogram2d(
+            pairs[:, 0], pairs[:, 1], bins=bins, range=(x_range, y_range), density=True
+        )
+        hist = np.ma.masked_less_equal(hist.T, 0)
+
+        fig, ax = plt.subplots(figsize=(10, 8))
+        if hist.count():
+            mesh = ax.pcolormesh(
+                x_edges, y_edges, hist,
+                norm=LogNorm(vmin=hist.min(), vmax=hist.max()),
+                cmap='viridis', shading='flat'
+            )
+            fig.colorbar(mesh, ax=ax, label='Sample Density (log scale)')
 
-        all_pairs = list(theoretical_prob_matrix.keys())
-        observed_freq = [sample_counter.get(pair, 0) / n for pair in all_pairs]
-        theoretical_prob = [theoretical_prob_matrix[pair] for pair in all_pairs]
+        levels = None
+        if density_func is not None:
+            x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+            y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+            x_mesh, y_mesh = np.meshgrid(x_centers, y_centers)
+            z = BivariateStatisticalAnalysisService._evaluate_density_grid(density_func, x_mesh, y_mesh)
+            positive = z[z > 0]
+            if positive.size and positive.max() > positive.min():
+                levels = np.geomspace(
+                    positive.min(), positive.max(), BivariateStatisticalAnalysisService.CONTOUR_LEVELS
+                )
+                contours = ax.contour(x_mesh, y_mesh, z, levels=levels, colors='red', linewidths=1)
+                ax.clabel(contours, fmt='%.1e', fontsize=7)
+
+        if kde:
+            grid_x, grid_y, density = BinnedKernelDensityEstimator.estimate_2d(
+                pairs[:, 0], pairs[:, 1], bounds=(x_range, y_range)
+            )
+            positive = density[density > 0]
+            if levels is None and positive.size and positive.max() > positive.min():
+                levels = np.geomspace(
+                    positive.max() * 1e-3, positive.max(), BivariateStatisticalAnalysisService.CONTOUR_LEVELS
+                )
+            if levels is not None:
+                ax.contour(grid_x, grid_y, density, levels=levels, colors='white', linewidths=1, linestyles='dashed')
+
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        ax.set_title(title)
+
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=120)
+        plt.close(fig)
+        buf.seek(0)
+        return base64.b64encode(buf.read()).decode('utf-8')
+
+    @staticmethod
+    def _discrete_axis_edges(values: np.ndarray, max_bins: int) -> np.ndarray:
+        if values.size > max_bins:
+            return np.linspace(values[0], values[-1], max_bins + 1)
+        if values.size == 1:
+            return np.array([values[0] - 0.5, values[0] + 0.5])
+        mids = (values[1:] + values[:-1]) / 2
+        return np.concatenate((
+            [values[0] - (mids[0] - values[0])],
+            mids,
+            [values[-1] + (values[-1] - mids[-1])],
+        ))
 
-        x_vals = [pair[0] for pair in all_pairs]
-        y_vals = [pair[1] for pair in all_pairs]
+    @staticmethod
+    def plot_discrete_3d_histogram(
+        sample: list[tuple[Any, Any]],
+        theoretical_prob_matrix: dict[tuple[Any, Any], float] | SparseDistributionTable,
+        title: str = "3D Histogram: Observed vs Theoretical",
+        max_bins: int = 20
+    ) -> str:
+        table = theoretical_prob_matrix
+        if not isinstance(table, SparseDistributionTable):
+            table = SparseDistributionTable.from_dict(theoretical_prob_matrix)
+
+        x_edges = BivariateStatisticalAnalysisService._discrete_axis_edges(
+            table.x_values.astype(float), max_bins
+        )
+        y_edges = BivariateStatisticalAnalysisService._discrete_axis_edges(
+            table.y_values.astype(float), max_bins
+        )
+
+        theoretical_prob, _, _ = np.histogram2d(
+            table.x_values[table.rows], table.y_values[table.cols],
+            bins=(x_edges, y_edges), weights=table.probabilities
+        )
+        sample_array = np.asarray(sample, dtype=float).reshape(-1, 2)
+        observed_counts, _, _ = np.histogram2d(
+            sample_array[:, 0], sample_array[:, 1], bins=(x_edges, y_edges)
+        )
+        observed_freq = observed_counts / max(len(sample_array), 1)
+
+        x_idx, y_idx = np.nonzero((theoretical_prob > 0) | (observed_freq > 0))
+        x_widths = np.diff(x_edges)[x_idx]
+        y_widths = np.diff(y_edges)[y_idx]
+        x_left = x_edges[x_idx]
+        y_left = y_edges[y_idx]
+        zeros = np.zeros(x_idx.size)
 
         fig = plt.figure(figsize=(12, 8))
         ax = fig.add_subplot(111, projection='3d')
 
-        ax.bar3d(x_vals, y_vals, [0] * len(x_vals), 0.5, 0.5, observed_freq,
+        ax.bar3d(x_left + 0.1 * x_widths, y_left + 0.1 * y_widths, zeros,
+                 0.4 * x_widths, 0.4 * y_widths, observed_freq[x_idx, y_idx],
                  color='skyblue', alpha=0.8, label='Observed Frequency')
 
-        ax.bar3d([x + 0.25 for x in x_vals], [y + 0.25 for y in y_vals], [0] * len(x_vals),
-                 0.5, 0.5, theoretical_prob,
+        ax.bar3d(x_left + 0.5 * x_widths, y_left + 0.5 * y_widths, zeros,
+                 0.4 * x_widths, 0.4 * y_widths, theoretical_prob[x_idx, y_idx],
                  color='red', alpha=0.8, label='Theoretical Probability')
 
         ax.set_xlabel('X')
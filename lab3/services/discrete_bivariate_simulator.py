@@ -1,51 +1,54 @@
+import random
 from typing import Any
 
+import numpy as np
+
 from lab3.services.base_bivariate_simulator import BaseBivariateSimulator
+from lab3.services.sparse_distribution_table import SparseDistributionTable
 
 
 class DiscreteBivariateSimulator(BaseBivariateSimulator):
-    def __init__(self, probability_matrix: dict[tuple[Any, Any], float]):
-        if abs(sum(probability_matrix.values()) - 1.0) > 1e-10:
-            raise ValueError("The sum of probabilities must be equal to 1.")
+    def __init__(self, probability_matrix: dict[tuple[Any, Any], float] | SparseDistributionTable):
+        # the table validates the total once (within TOLERANCE) and renormalises it
+        if isinstance(probability_matrix, SparseDistributionTable):
+            table = probability_matrix
+        else:
+            table = SparseDistributionTable.from_dict(probability_matrix)
+
+        self.table = table
+        self.cumsums = np.cumsum(table.probabilities)
 
-        self.probability_matrix = probability_matrix
-        self.pairs = list(probability_matrix.keys())
-        self.probabilities = list(probability_matrix.values())
+    @property
+    def probability_matrix(self) -> dict[tuple[Any, Any], float]:
+        return self.table.to_dict()
 
-        self.cumsums = []
-        cumsum = 0.0
-        for p in self.probabilities:
-            self.cumsums.append(cumsum)
-            cumsum += p
-        self.cumsums.append(cumsum)
+    def _locate(self, u: np.ndarray) -> np.ndarray:
+        return np.minimum(np.searchsorted(self.cumsums, u, side='right'), self.table.nnz - 1)
 
     def simulate_single(self) -> tuple[Any, Any]:
         u = self.generate_uniform()
-        for i in range(len(self.cumsums) - 1):
-            if self.cumsums[i] <= u < self.cumsums[i + 1] or (i == len(self.cumsums) - 2 and u == 1.0):
-                return self.pairs[i]
-        raise RuntimeError("Failed to determine the interval for the value.")
+        return self.table.pairs_at(self._locate(np.array([u])))[0]
+
+    def generate_sample(self, size: int) -> list[tuple[Any, Any]]:
+        if size <= 0:
+            raise ValueError("The sample size should be positive.")
+        # one generator per call, seeded from `random`, so random.seed still reproduces the sample
+        rng = np.random.default_rng(random.getrandbits(64))
+        u = rng.random(size)
+        return self.table.pairs_at(self._locate(u))
 
     def get_marginal_x(self) -> dict[Any, float]:
-        marginal = {}
-        for (x, y), p in self.probability_matrix.items():
-            marginal[x] = marginal.get(x, 0.0) + p
-        return marginal
+        return dict(zip(self.table.x_values.tolist(), self.table.marginal_x().tolist()))
 
     def get_marginal_y(self) -> dict[Any, float]:
-        marginal = {}
-        for (x, y), p in self.probability_matrix.items():
-            marginal[y] = marginal.get(y, 0.0) + p
-        return marginal
+        return dict(zip(self.table.y_values.tolist(), self.table.marginal_y().tolist()))
 
     def get_conditional_y_given_x(self, x_value) -> dict[Any, float]:
-        conditional = {}
-        total_prob_x = self.get_marginal_x().get(x_value, 0.0)
+        row = self.table.row_of(x_value)
+        if row is None:
+            return {}
+        y_values, probs = self.table.row_slice(row)
+        total_prob_x = float(probs.sum())
         if total_prob_x == 0.0:
-            return conditional
-
-        for (x, y), p in self.probability_matrix.items():
-            if x == x_value:
-                conditional[y] = p / total_prob_x
-
-        return conditional
+            return {}
+        return dict(zip(y_values.tolist(), (probs / total_prob_x).tolist()))
@@ -0,0 +1,196 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from lab3.services.base_bivariate_simulator import BaseBivariateSimulator
+
+
+def _log_density(model, x: np.ndarray, y: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    inside = (x >= bounds[0]) & (x <= bounds[1]) & (y >= bounds[2]) & (y <= bounds[3])
+    with np.errstate(divide='ignore'):
+        log_f = np.log(np.asarray(model.density_function(x, y), dtype=float))
+    return np.where(inside, log_f, -np.inf)
+
+
+def _run_chain_block(
+        model,
+        bounds: np.ndarray,
+        n_chains: int,
+        n_draws: int,
+        burn_in: int,
+        thin: int,
+        step: np.ndarray,
+        seed: np.random.SeedSequence
+) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(bounds[0], bounds[1], n_chains)
+    y = rng.uniform(bounds[2], bounds[3], n_chains)
+    log_f = _log_density(model, x, y, bounds)
+    step = np.broadcast_to(step, (2, n_chains)).copy()
+
+    draws = np.empty((n_chains, n_draws, 2))
+    accepted = np.zeros(2)
+    window_accepted = np.zeros((2, n_chains))
+    total_steps = burn_in + n_draws * thin
+
+    for t in range(total_steps):
+        # x | y: random-walk Metropolis on the conditional f(x | y), proportional to f(x, y)
+        x_new = x + step[0] * rng.standard_normal(n_chains)
+        log_f_new = _log_density(model, x_new, y, bounds)
+        accept = np.log(rng.random(n_chains)) < log_f_new - log_f
+        x = np.where(accept, x_new, x)
+        log_f = np.where(accept, log_f_new, log_f)
+        accept_x = accept
+
+        # y | x: same update on the other coordinate
+        y_new = y + step[1] * rng.standard_normal(n_chains)
+        log_f_new = _log_density(model, x, y_new, bounds)
+        accept = np.log(rng.random(n_chains)) < log_f_new - log_f
+        y = np.where(accept, y_new, y)
+        log_f = np.where(accept, log_f_new, log_f)
+        accept_y = accept
+
+        if t < burn_in:
+            window_accepted[0] += accept_x
+            window_accepted[1] += accept_y
+            if (t + 1) % GibbsSampler.ADAPT_WINDOW == 0:
+                rate = window_accepted / GibbsSampler.ADAPT_WINDOW
+                step *= np.exp(rate - GibbsSampler.TARGET_ACCEPTANCE)
+                window_accepted[:] = 0
+            continue
+
+        accepted[0] += accept_x.sum()
+        accepted[1] += accept_y.sum()
+        k = t - burn_in
+        if k % thin == 0:
+            draws[:, k // thin, 0] = x
+            draws[:, k // thin, 1] = y
+
+    return draws, accepted
+
+
+class GibbsSampler(BaseBivariateSimulator):
+    TARGET_ACCEPTANCE = 0.44
+    ADAPT_WINDOW = 50
+
+    def __init__(
+            self,
+            model,
+            n_chains: int = 4,
+            burn_in: int = 1000,
+            thin: int = 1,
+            n_workers: int | None = None,
+            step: tuple[float, float] | None = None
+    ):
+        if n_chains < 2:
+            raise ValueError("At least two chains are required for convergence diagnostics.")
+        if burn_in < 0 or thin < 1:
+            raise ValueError("Burn-in must be non-negative and thinning must be positive.")
+        self.model = model
+        self.bounds = np.array([model.x_min, model.x_max, model.y_min, model.y_max], dtype=float)
+        self.n_chains = n_chains
+        self.burn_in = burn_in
+        self.thin = thin
+        self.n_workers = max(1, min(n_workers or os.cpu_count() or 1, n_chains))
+        if step is None:
+            step = ((self.bounds[1] - self.bounds[0]) / 10, (self.bounds[3] - self.bounds[2]) / 10)
+        self.step = np.array(step, dtype=float).reshape(2, 1)
+        self.last_run: dict[str, Any] | None = None
+
+    def run(self, n_draws: int) -> dict[str, Any]:
+        if n_draws < 4:
+            raise ValueError("At least four draws per chain are required.")
+
+        seeds = np.random.SeedSequence(random.getrandbits(128)).spawn(self.n_workers)
+        block_sizes = [len(block) for block in np.array_split(np.arange(self.n_chains), self.n_workers)]
+        args = [
+            (self.model, self.bounds, size, n_draws, self.burn_in, self.thin, self.step, seed)
+            for size, seed in zip(block_sizes, seeds)
+        ]
+
+        if self.n_workers == 1:
+            results = [_run_chain_block(*args[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                results = list(executor.map(_run_chain_block, *zip(*args)))
+
+        draws = np.concatenate([block for block, _ in results], axis=0)
+        accepted = sum(acc for _, acc in results)
+        post_burn_steps = self.n_chains * n_draws * self.thin
+
+        self.last_run = {
+            'samples': draws,
+            'n_chains': self.n_chains,
+            'n_draws': n_draws,
+            'acceptance_rate': {
+                'x': float(accepted[0] / post_burn_steps),
+                'y': float(accepted[1] / post_burn_steps),
+            },
+            'ess': {
+                'x': self.effective_sample_size(draws[:, :, 0]),
+                'y': self.effective_sample_size(draws[:, :, 1]),
+            },
+            'r_hat': {
+                'x': self.r_hat(draws[:, :, 0]),
+                'y': self.r_hat(draws[:, :, 1]),
+            },
+        }
+        return self.last_run
+
+    def simulate_single(self) -> tuple[float, float]:
+        return self.generate_sample(1)[0]
+
+    def generate_sample(self, size: int) -> list[tuple[float, float]]:
+        if size <= 0:
+            raise ValueError("The sample size should be positive.")
+        n_draws = max(4, math.ceil(size / self.n_chains))
+        draws = self.run(n_draws)['samples']
+        pairs = draws.transpose(1, 0, 2).reshape(-1, 2)[:size]
+        return list(map(tuple, pairs.tolist()))
+
+    @staticmethod
+    def _split_chains(draws: np.ndarray) -> np.ndarray:
+        half = draws.shape[1] // 2
+        return np.concatenate((draws[:, :half], draws[:, draws.shape[1] - half:]), axis=0)
+
+    @staticmethod
+    def r_hat(draws: np.ndarray) -> float:
+        chains = GibbsSampler._split_chains(np.asarray(draws, dtype=float))
+        m, n = chains.shape
+        chain_means = chains.mean(axis=1)
+        within = chains.var(axis=1, ddof=1).mean()
+        between = n * chain_means.var(ddof=1)
+        if within <= 0:
+            return float('nan')
+        var_plus = (n - 1) / n * within + between / n
+        return float(np.sqrt(var_plus / within))
+
+    @staticmethod
+    def effective_sample_size(draws: np.ndarray) -> float:
+        chains = GibbsSampler._split_chains(np.asarray(draws, dtype=float))
+        m, n = chains.shape
+        centered = chains - chains.mean(axis=1, keepdims=True)
+
+        size = 1 << (2 * n - 1).bit_length()
+        spectrum = np.fft.rfft(centered, n=size, axis=1)
+        acov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :n] / n
+
+        chain_var = acov[:, 0] * n / (n - 1)
+        within = chain_var.mean()
+        var_plus = (n - 1) / n * within + chains.mean(axis=1).var(ddof=1)
+        if var_plus <= 0:
+            return float('nan')
+        rho = 1 - (within - acov.mean(axis=0)) / var_plus
+        rho[0] = 1.0
+
+        # Geyer's initial monotone sequence over pairs of autocorrelations
+        pair_sums = rho[:-1:2] + rho[1::2]
+        non_positive = np.flatnonzero(pair_sums <= 0)
+        pair_sums = pair_sums[:non_positive[0]] if non_positive.size else pair_sums
+        pair_sums = np.minimum.accumulate(pair_sums)
+        tau = -1 + 2 * pair_sums.sum()
+        return float(m * n / max(tau, 1 / np.log10(m * n)))
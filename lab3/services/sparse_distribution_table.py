@@ -0,0 +1,183 @@
+import os
+from typing import Any, Iterator
+
+import numpy as np
+from scipy import sparse
+
+
+class SparseDistributionTable:
+    TOLERANCE = 1e-6
+    NPZ_KEYS = ('x', 'y', 'p')
+
+    def __init__(self, x_values: np.ndarray, y_values: np.ndarray, matrix: sparse.csr_array):
+        self.x_values = x_values
+        self.y_values = y_values
+        self.matrix = matrix
+        self._rows: np.ndarray | None = None
+
+    @classmethod
+    def from_arrays(
+            cls,
+            x: np.ndarray,
+            y: np.ndarray,
+            p: np.ndarray,
+            tolerance: float = TOLERANCE
+    ) -> "SparseDistributionTable":
+        x = cls._as_values(x)
+        y = cls._as_values(y)
+        p = np.asarray(p, dtype=float).ravel()
+
+        if not (x.size == y.size == p.size):
+            raise ValueError("Columns x, y and probability must have the same length.")
+        if p.size == 0:
+            raise ValueError("Matrix cannot be empty.")
+        if not np.all(np.isfinite(p)):
+            raise ValueError("Probabilities must be finite numbers.")
+
+        negative = np.flatnonzero(p < 0)
+        if negative.size:
+            raise ValueError(f"Row {negative[0] + 1}: Probability cannot be negative.")
+
+        x_values, rows = np.unique(x, return_inverse=True)
+        y_values, cols = np.unique(y, return_inverse=True)
+
+        linear = rows.astype(np.int64) * y_values.size + cols
+        order = np.argsort(linear, kind='stable')
+        repeated = np.flatnonzero(linear[order][1:] == linear[order][:-1])
+        if repeated.size:
+            first = order[repeated[0] + 1]
+            raise ValueError(f"Row {first + 1}: Duplicate key (x={x[first]}, y={y[first]}).")
+
+        total = float(p.sum())
+        if abs(total - 1.0) > tolerance:
+            raise ValueError(f"Sum of probabilities must be 1.0. Current sum is {total:.6f}.")
+        # rounding in uploaded files is accepted above, so the cumulative sums must still end at 1
+        p = p / total
+
+        matrix = sparse.csr_array(
+            (p, (rows, cols)),
+            shape=(x_values.size, y_values.size)
+        )
+        matrix.eliminate_zeros()
+        return cls(x_values, y_values, matrix)
+
+    @classmethod
+    def from_dict(cls, probability_matrix: dict[tuple[Any, Any], float]) -> "SparseDistributionTable":
+        if not probability_matrix:
+            raise ValueError("Matrix cannot be empty.")
+        keys = np.array(list(probability_matrix.keys()), dtype=float)
+        probs = np.fromiter(probability_matrix.values(), dtype=float, count=len(probability_matrix))
+        return cls.from_arrays(keys[:, 0], keys[:, 1], probs)
+
+    @classmethod
+    def from_csv(cls, file) -> "SparseDistributionTable":
+        first = file.readline()
+        if isinstance(first, bytes):
+            first = first.decode('utf-8', errors='replace')
+        try:
+            [float(v) for v in first.split(',')]
+            header_rows = 0
+        except ValueError:
+            header_rows = 1
+        file.seek(0)
+
+        try:
+            data = np.loadtxt(
+                file,
+                delimiter=',',
+                comments='#',
+                skiprows=header_rows,
+                ndmin=2,
+                dtype=float,
+                encoding='utf-8'
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid CSV file: {e}")
+
+        if data.size == 0:
+            raise ValueError("Matrix cannot be empty.")
+        if data.shape[1] != 3:
+            raise ValueError(f"Expected 3 columns (x, y, probability), got {data.shape[1]}.")
+        return cls.from_arrays(data[:, 0], data[:, 1], data[:, 2])
+
+    @classmethod
+    def from_npz(cls, file) -> "SparseDistributionTable":
+        with np.load(file, allow_pickle=False) as archive:
+            missing = [key for key in cls.NPZ_KEYS if key not in archive.files]
+            if missing:
+                raise ValueError(f"The .npz archive must contain arrays {', '.join(cls.NPZ_KEYS)}; "
+                                 f"missing {', '.join(missing)}.")
+            x, y, p = (archive[key] for key in cls.NPZ_KEYS)
+        return cls.from_arrays(x, y, p)
+
+    @classmethod
+    def from_upload(cls, uploaded_file) -> "SparseDistributionTable":
+        extension = os.path.splitext(uploaded_file.name)[1].lower()
+        if extension == '.csv':
+            return cls.from_csv(uploaded_file)
+        if extension == '.npz':
+            return cls.from_npz(uploaded_file)
+        raise ValueError(f"Unsupported file type '{extension}'. Upload a .csv or .npz file.")
+
+    @property
+    def nnz(self) -> int:
+        return int(self.matrix.nnz)
+
+    @property
+    def total(self) -> float:
+        return float(self.matrix.data.sum())
+
+    @property
+    def rows(self) -> np.ndarray:
+        if self._rows is None:
+            self._rows = np.repeat(
+                np.arange(self.x_values.size, dtype=np.int64),
+                np.diff(self.matrix.indptr)
+            )
+        return self._rows
+
+    @property
+    def cols(self) -> np.ndarray:
+        return self.matrix.indices
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        return self.matrix.data
+
+    def pairs_at(self, indices: np.ndarray) -> list[tuple[Any, Any]]:
+        xs = self.x_values[self.rows[indices]].tolist()
+        ys = self.y_values[self.cols[indices]].tolist()
+        return list(zip(xs, ys))
+
+    def marginal_x(self) -> np.ndarray:
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    def marginal_y(self) -> np.ndarray:
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def row_of(self, x_value) -> int | None:
+        pos = int(np.searchsorted(self.x_values, x_value))
+        if pos < self.x_values.size and self.x_values[pos] == x_value:
+            return pos
+        return None
+
+    def row_slice(self, row: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return self.y_values[self.matrix.indices[start:end]], self.matrix.data[start:end]
+
+    def items(self, limit: int | None = None) -> Iterator[tuple[tuple[Any, Any], float]]:
+        count = self.nnz if limit is None else min(limit, self.nnz)
+        pairs = self.pairs_at(np.arange(count))
+        return zip(pairs, self.probabilities[:count].tolist())
+
+    def to_dict(self, limit: int | None = None) -> dict[tuple[Any, Any], float]:
+        return dict(self.items(limit))
+
+    @staticmethod
+    def _as_values(values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=float).ravel()
+        if not np.all(np.isfinite(values)):
+            raise ValueError("Values of x and y must be finite numbers.")
+        if np.array_equal(values, np.round(values)):
+            return values.astype(np.int64)
+        return values
@@ -9,10 +9,13 @@ from lab3.services.bivariate_statistical_analysis import (
 )
 from lab3.services.continuous_bivariate_simulator import ContinuousBivariateSimulator
 from lab3.services.discrete_bivariate_simulator import DiscreteBivariateSimulator
+from lab3.services.gibbs_sampler import GibbsSampler
 
 
 class Lab3View(TemplateView):
     template_name = 'lab3/index.html'
+    DISCRETE_PREVIEW_LIMIT = 50
+    CONDITIONAL_PREVIEW_LIMIT = 10
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -32,7 +35,19 @@ class Lab3View(TemplateView):
                     confidence_level = form.cleaned_data['confidence_level']
 
                     simulator = ContinuousBivariateSimulator()
-                    sample = simulator.generate_sample(sample_size)
+                    mcmc_diagnostics = None
+                    if form.cleaned_data['sampling_method'] == 'gibbs':
+                        sampler = GibbsSampler(simulator)
+                        sample = sampler.generate_sample(sample_size)
+                        mcmc_diagnostics = {
+                            'n_chains': sampler.last_run['n_chains'],
+                            'n_draws': sampler.last_run['n_draws'],
+                            'acceptance_rate': sampler.last_run['acceptance_rate'],
+                            'ess': sampler.last_run['ess'],
+                            'r_hat': sampler.last_run['r_hat'],
+                        }
+                    else:
+                        sample = simulator.generate_sample(sample_size)
 
                     x_vals, y_vals = BivariateStatisticalAnalysisService.separate_components(sample)
 
@@ -53,11 +68,12 @@ class Lab3View(TemplateView):
                         y_vals, confidence_level, 'std'
                     )
 
-                    cov = BivariateStatisticalAnalysisService.calculate_covariance(x_vals, y_vals)
-                    corr = BivariateStatisticalAnalysisService.calculate_correlation(x_vals, y_vals)
+                    moments = BivariateStatisticalAnalysisService.calculate_moments(x_vals, y_vals)
+                    cov = moments.covariance
+                    corr = moments.correlation
 
-                    independence_test = BivariateStatisticalAnalysisService.test_independence_pearson(
-                        x_vals, y_vals, alpha=1-confidence_level
+                    independence_test = BivariateStatisticalAnalysisService.test_independence_from_moments(
+                        moments, alpha=1-confidence_level
                     )
 
                     hist_x_base64, hist_y_base64 = (
@@ -66,10 +82,22 @@ class Lab3View(TemplateView):
                             density_func_x=simulator.marginal_density_x,
                             density_func_y=simulator.marginal_density_y,
                             title_x="Marginal Distribution of X",
-                            title_y="Marginal Distribution of Y"
+                            title_y="Marginal Distribution of Y",
+                            kde=True
                         )
                     )
 
+                    heatmap_base64 = None
+                    try:
+                        heatmap_base64 = BivariateStatisticalAnalysisService.plot_density_heatmap(
+                            sample,
+                            density_func=simulator.density_function,
+                            title="Sample Density Heatmap with Theoretical (red) and KDE (white) Contours",
+                            kde=True
+                        )
+                    except Exception as e:
+                        print(f"Density heatmap failed: {e}")
+
                     hist_3d_base64 = None
                     if form.cleaned_data.get('include_3d', False):
                         try:
@@ -105,8 +133,10 @@ class Lab3View(TemplateView):
                         'independence_test': independence_test,
                         'histogram_x': hist_x_base64,
                         'histogram_y': hist_y_base64,
+                        'heatmap': heatmap_base64,
                         'histogram_3d': hist_3d_base64,
                         'conditional_densities_demo': conditional_densities_demo,
+                        'mcmc_diagnostics': mcmc_diagnostics,
                         'confidence_level': confidence_level,
                     }
                 except Exception as e:
@@ -116,14 +146,14 @@ class Lab3View(TemplateView):
                 context['continuous_form'] = form
 
         elif 'run_discrete' in request.POST:
-            form = Task2Form(request.POST)
+            form = Task2Form(request.POST, request.FILES)
             if form.is_valid():
                 try:
-                    prob_matrix = form.cleaned_data['distribution_matrix']
+                    prob_table = form.cleaned_data['distribution_table']
                     sample_size = form.cleaned_data['sample_size']
                     confidence_level = form.cleaned_data['confidence_level']
 
-                    simulator = DiscreteBivariateSimulator(prob_matrix)
+                    simulator = DiscreteBivariateSimulator(prob_table)
                     sample = simulator.generate_sample(sample_size)
 
                     x_vals, y_vals = BivariateStatisticalAnalysisService.separate_components(sample)
@@ -148,11 +178,12 @@ class Lab3View(TemplateView):
                             numeric_y, confidence_level, 'std'
                         )
 
-                        cov = BivariateStatisticalAnalysisService.calculate_covariance(numeric_x, numeric_y)
-                        corr = BivariateStatisticalAnalysisService.calculate_correlation(numeric_x, numeric_y)
+                        moments = BivariateStatisticalAnalysisService.calculate_moments(numeric_x, numeric_y)
+                        cov = moments.covariance
+                        corr = moments.correlation
 
-                        independence_test = BivariateStatisticalAnalysisService.test_independence_pearson(
-                            numeric_x, numeric_y, alpha=1 - confidence_level
+                        independence_test = BivariateStatisticalAnalysisService.test_independence_from_moments(
+                            moments, alpha=1 - confidence_level
                         )
                     except (ValueError, TypeError):
                         stats_x = stats_y = ci_mean_x = ci_mean_y = ci_std_x = ci_std_y = None
@@ -163,10 +194,10 @@ class Lab3View(TemplateView):
                         }
 
                     chart_x_base64 = BivariateStatisticalAnalysisService.plot_histogram(
-                        x_vals, is_continuous=False, title="Marginal Distribution of X"
+                        x_vals, is_continuous=False, title="Marginal Distribution of X", kde=True
                     )
                     chart_y_base64 = BivariateStatisticalAnalysisService.plot_histogram(
-                        y_vals, is_continuous=False, title="Marginal Distribution of Y"
+                        y_vals, is_continuous=False, title="Marginal Distribution of Y", kde=True
                     )
 
                     chart_3d_base64 = None
@@ -174,7 +205,7 @@ class Lab3View(TemplateView):
                         try:
                             chart_3d_base64 = BivariateStatisticalAnalysisService.plot_discrete_3d_histogram(
                                 sample,
-                                prob_matrix,
+                                prob_table,
                                 title="3D Histogram: Observed vs Theoretical"
                             )
                         except Exception as e:
@@ -182,14 +213,21 @@ class Lab3View(TemplateView):
 
                     marginal_x = simulator.get_marginal_x()
                     conditional_distributions = {}
-                    for x_val in marginal_x.keys():
+                    for x_val in list(marginal_x.keys())[:self.DISCRETE_PREVIEW_LIMIT]:
                         cond_dist = simulator.get_conditional_y_given_x(x_val)
-                        conditional_distributions[x_val] = cond_dist
+                        # only the most probable values of Y are listed for each x
+                        top = sorted(cond_dist.items(), key=lambda item: item[1], reverse=True)
+                        conditional_distributions[x_val] = {
+                            'entries': dict(top[:self.CONDITIONAL_PREVIEW_LIMIT]),
+                            'size': len(cond_dist),
+                        }
 
                     context['discrete_result'] = {
                         'sample': sample[:10],
                         'sample_size': sample_size,
-                        'distribution_matrix': prob_matrix,
+                        'distribution_matrix': prob_table.to_dict(limit=self.DISCRETE_PREVIEW_LIMIT),
+                        'distribution_size': prob_table.nnz,
+                        'distinct_x': len(marginal_x),
                         'stats_x': stats_x,
                         'stats_y': stats_y,
                         'ci_mean_x': ci_mean_x,
@@ -202,7 +240,7 @@ class Lab3View(TemplateView):
                         'chart_x': chart_x_base64,
                         'chart_y': chart_y_base64,
                         'chart_3d': chart_3d_base64,
-                        'marginal_x': marginal_x,
+                        'marginal_x': dict(list(marginal_x.items())[:self.DISCRETE_PREVIEW_LIMIT]),
                         'conditional_distributions': conditional_distributions,
                         'confidence_level': confidence_level,
                     }
@@ -1,10 +1,28 @@
 from django import forms
 
+from lab4.services.balance_equations_solver import BalanceEquationsSolver
+from lab4.services.phase_type import PhaseType
+from lab4.services.phase_type_priority_model import PhaseTypePriorityModel
+from lab4.services.priority_queue_model import PriorityQueueModel
+
 
 class PriorityQueueForm(forms.Form):
+    SOLVER_CHOICES = [
+        ('auto', 'Automatic (by state-space size)'),
+        ('dense', 'Dense LU (np.linalg.solve)'),
+        ('spsolve', 'Sparse direct (spsolve)'),
+        ('splu', 'Sparse LU (splu)'),
+        ('gmres', 'GMRES + ILU'),
+        ('bicgstab', 'BiCGSTAB + ILU'),
+        ('gauss_seidel', 'Gauss–Seidel'),
+        ('power', 'Power iteration (uniformized chain)'),
+        ('level_reduction', 'Level reduction (block-tridiagonal by i + j)'),
+    ]
+
     queue_length = forms.IntegerField(
         label="Queue length (R)",
         min_value=0,
+        max_value=1000,
         initial=2,
         help_text="Number of places in the queue (excluding the service channel)."
     )
@@ -44,3 +62,128 @@ class PriorityQueueForm(forms.Form):
         min_value=0,
         help_text="Set for reproducible results."
     )
+    replications = forms.IntegerField(
+        label="Independent replications",
+        min_value=1,
+        max_value=200,
+        initial=1,
+        required=False,
+        help_text="With 2 or more, runs are spread over a process pool and reported with 95% Student-t intervals."
+    )
+    relative_precision = forms.FloatField(
+        label="Target relative precision (optional)",
+        min_value=0.001,
+        max_value=0.5,
+        required=False,
+        help_text="If set, a sequential run with MSER-5 warm-up removal and batch means stops once every "
+                  "metric's 95% half-width is within this fraction of its mean (capped at 100× the simulation time)."
+    )
+    rare_event_cycles = forms.IntegerField(
+        label="Rare-event cycles (optional)",
+        min_value=2,
+        max_value=100000,
+        required=False,
+        help_text="If set, blocking probabilities are also estimated by importance sampling over this many "
+                  "regeneration cycles; suited to tiny blocking at large R or light load."
+    )
+    sensitivities = forms.BooleanField(
+        label="Parameter sensitivities",
+        required=False,
+        initial=False,
+        help_text="Derivatives of the metrics with respect to λ1, λ2, μ1, μ2 from one LU factor, "
+                  "and the change when R grows by one."
+    )
+    solver = forms.ChoiceField(
+        label="Steady-state solver",
+        choices=SOLVER_CHOICES,
+        initial='auto',
+        required=False,
+        help_text="Sparse and iterative solvers handle the largest allowed queue (R = 1000, about 500,000 states)."
+    )
+    tolerance = forms.FloatField(
+        label="Solver tolerance",
+        min_value=1e-15,
+        max_value=1e-3,
+        initial=BalanceEquationsSolver.DEFAULT_TOL,
+        required=False,
+        help_text="Relative residual / convergence tolerance for iterative solvers."
+    )
+
+    transient_horizon = forms.FloatField(
+        label="Transient horizon (optional)",
+        min_value=0.001,
+        max_value=1e6,
+        required=False,
+        help_text="If set, P(t) is computed from an empty system on [0, horizon] by uniformization; "
+                  "times beyond the work budget (rate × horizon × transitions) show the stationary distribution."
+    )
+    transient_points = forms.IntegerField(
+        label="Transient time points",
+        min_value=2,
+        max_value=200,
+        initial=11,
+        required=False
+    )
+
+    arrival_scv = forms.FloatField(
+        label="Interarrival SCV (optional)",
+        min_value=0.05,
+        max_value=50.0,
+        required=False,
+        help_text="Squared coefficient of variation of interarrival times: Erlang below 1, H2 above 1, same means."
+    )
+    service_scv = forms.FloatField(
+        label="Service-time SCV (optional)",
+        min_value=0.05,
+        max_value=50.0,
+        required=False,
+        help_text="Squared coefficient of variation of service times; with either SCV set, a phase-type "
+                  "model is solved and simulated alongside the exponential one."
+    )
+
+    details_page = forms.IntegerField(
+        min_value=1,
+        required=False,
+        widget=forms.HiddenInput()
+    )
+
+    def clean_solver(self):
+        return self.cleaned_data.get('solver') or 'auto'
+
+    def clean_tolerance(self):
+        tol = self.cleaned_data.get('tolerance')
+        return tol if tol is not None else BalanceEquationsSolver.DEFAULT_TOL
+
+    def clean_transient_points(self):
+        return self.cleaned_data.get('transient_points') or 11
+
+    def clean_details_page(self):
+        return self.cleaned_data.get('details_page') or 1
+
+    def clean_replications(self):
+        return self.cleaned_data.get('replications') or 1
+
+    def clean(self):
+        cleaned = super().clean()
+        r = cleaned.get('queue_length')
+        arrival_scv = cleaned.get('arrival_scv')
+        service_scv = cleaned.get('service_scv')
+        if r is not None and (arrival_scv or service_scv):
+            # phase counts depend only on the SCV, so a unit mean is enough to size the model
+            arrival = PhaseType.fit(1.0, arrival_scv or 1.0).n_phases
+            service = PhaseType.fit(1.0, service_scv or 1.0).n_phases
+            n_states = PhaseTypePriorityModel.count_states(r, arrival * arrival, service, service)
+            if n_states > PhaseTypePriorityModel.MAX_STATES:
+                raise forms.ValidationError(
+                    f"The phase-type model would have {n_states} states (limit {PhaseTypePriorityModel.MAX_STATES}); "
+                    "lower R or move the SCVs closer to 1."
+                )
+        if r is not None and cleaned.get('sensitivities'):
+            # the rates do not affect the size; states are only built on demand
+            n_states = PriorityQueueModel(r, 1.0, 1.0, 1.0, 1.0).n_states
+            if n_states > BalanceEquationsSolver.DIRECT_LIMIT:
+                raise forms.ValidationError(
+                    f"Sensitivities need a direct LU factor, limited to {BalanceEquationsSolver.DIRECT_LIMIT} states; "
+                    f"R = {r} gives {n_states}. Lower R or turn sensitivities off."
+                )
+        return cleaned
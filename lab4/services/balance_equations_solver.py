@@ -1,48 +1,227 @@
+from typing import Iterator, Sequence
+
 import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as splinalg
+
+from lab4.services.level_reduction_solver import LevelReductionSolver
 
 
 class BalanceEquationsSolver:
-    def __init__(self, transitions: dict[tuple[int, int], dict[tuple[int, int], float]]):
-        if not transitions:
-            raise ValueError("transitions must be a non-empty dict")
+    METHODS = ('auto', 'dense', 'spsolve', 'splu', 'gmres', 'bicgstab', 'gauss_seidel', 'power', 'level_reduction')
+    DENSE_LIMIT = 500
+    DIRECT_LIMIT = 50000
+    DEFAULT_TOL = 1e-10
+    DEFAULT_MAXITER = 10000
+    NORMALIZATION_TERMS = 50
+
+    def __init__(
+        self,
+        transitions: dict[tuple[int, int], dict[tuple[int, int], float]] | None = None,
+        generator: sparse.sparray | None = None,
+        states: Sequence[tuple[int, int]] | None = None,
+        levels: np.ndarray | None = None,
+    ):
+        if generator is None:
+            if not transitions:
+                raise ValueError("transitions must be a non-empty dict")
+            states = list(transitions.keys())
+            generator = self._assemble_generator(transitions, states)
+        elif states is None or len(states) != generator.shape[0]:
+            raise ValueError("states must be given for every row of the generator")
         self.transitions = transitions
-        self.states = list(transitions.keys())
+        self.states = states
         self.n = len(self.states)
+        self.generator = sparse.csr_array(generator)
+        self.levels = levels
+        self.iterations: int | None = None
+        self._incoming_index: sparse.csc_array | None = None
+        self._lu: splinalg.SuperLU | None = None
 
-    def solve(self) -> dict[tuple[int, int], float]:
-        n = self.n
-        A = np.zeros((n, n), dtype=float)
-        b = np.zeros(n, dtype=float)
-        idx = {s: k for k, s in enumerate(self.states)}
-        for s in self.states:
+    @staticmethod
+    def _assemble_generator(
+        transitions: dict[tuple[int, int], dict[tuple[int, int], float]],
+        states: list[tuple[int, int]],
+    ) -> sparse.csr_array:
+        idx = {s: k for k, s in enumerate(states)}
+        rows, cols, values = [], [], []
+        for s in states:
             s_idx = idx[s]
-            outs = self.transitions[s]
-            outgoing_sum = sum(outs.values())
-            A[s_idx, s_idx] -= outgoing_sum
+            outs = transitions[s]
             for t, rate in outs.items():
-                t_idx = idx[t]
-                A[t_idx, s_idx] += rate
-        A[-1, :] = 1.0
+                rows.append(s_idx)
+                cols.append(idx[t])
+                values.append(rate)
+            rows.append(s_idx)
+            cols.append(s_idx)
+            values.append(-sum(outs.values()))
+        n = len(states)
+        return sparse.csr_array((values, (rows, cols)), shape=(n, n))
+
+    def _normalized_system(self) -> tuple[sparse.csc_array, np.ndarray]:
+        n = self.n
+        a = sparse.coo_array(self.generator.T)
+        keep = a.row != n - 1
+        last = np.arange(n)
+        A = sparse.csc_array(
+            (
+                np.concatenate((a.data[keep], np.ones(n))),
+                (np.concatenate((a.row[keep], np.full(n, n - 1))), np.concatenate((a.col[keep], last))),
+            ),
+            shape=(n, n),
+        )
+        b = np.zeros(n)
         b[-1] = 1.0
-        probs = np.linalg.solve(A, b)
-        return {self.states[i]: float(probs[i]) for i in range(n)}
+        return A, b
 
-    def get_balance_equations(self) -> list[str]:
-        equations = []
-        for s in self.states:
-            outs = self.transitions[s]
-            incoming = []
-            for t, t_outs in self.transitions.items():
-                if s in t_outs:
-                    rate = t_outs[s]
-                    incoming.append(f"{rate}·P{t}")
-            outgoing_sum = sum(outs.values())
-            if incoming:
-                left = " + ".join(incoming)
+    def factorize(self) -> splinalg.SuperLU:
+        """LU factor of the normalised system A·p = e_n, cached for further solves with A or A^T."""
+        if self._lu is None:
+            A, _ = self._normalized_system()
+            self._lu = splinalg.splu(A)
+        return self._lu
+
+    @classmethod
+    def default_method(cls, n: int, structured: bool = False) -> str:
+        if n <= cls.DENSE_LIMIT:
+            return 'dense'
+        if n <= cls.DIRECT_LIMIT:
+            return 'level_reduction' if structured else 'splu'
+        return 'bicgstab'
+
+    def solve(self, method: str = 'auto', tol: float = DEFAULT_TOL, maxiter: int | None = None) -> dict:
+        probs = self.solve_vector(method, tol, maxiter)
+        return {self.states[i]: float(probs[i]) for i in range(self.n)}
+
+    def solve_vector(
+        self,
+        method: str = 'auto',
+        tol: float = DEFAULT_TOL,
+        maxiter: int | None = None,
+        x0: np.ndarray | None = None,
+    ) -> np.ndarray:
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown solver method '{method}'. Choose one of: {', '.join(self.METHODS)}.")
+        if method == 'auto':
+            method = self.default_method(self.n, self.levels is not None)
+        maxiter = maxiter or self.DEFAULT_MAXITER
+        self.iterations = None
+
+        if method == 'level_reduction':
+            if self.levels is None:
+                raise ValueError("level_reduction requires the level of every state.")
+            probs = LevelReductionSolver(self.generator, self.levels).solve_vector()
+        elif method == 'power':
+            probs = self._solve_power(tol, maxiter)
+        elif method == 'gauss_seidel':
+            probs = self._solve_gauss_seidel(tol, maxiter)
+        else:
+            A, b = self._normalized_system()
+            if method == 'dense':
+                probs = np.linalg.solve(A.toarray(), b)
+            elif method == 'spsolve':
+                probs = splinalg.spsolve(A, b)
+            elif method == 'splu':
+                probs = self.factorize().solve(b)
             else:
-                left = "0"
-            right = f"{outgoing_sum}·P{s}"
-            equations.append(f"{left} = {right}")
-        norm = " + ".join(f"P{s}" for s in self.states) + " = 1"
-        equations.append(norm)
-        return equations
+                probs = self._solve_krylov(A, b, method, tol, maxiter, x0)
+
+        probs = np.maximum(probs, 0.0)
+        return probs / probs.sum()
+
+    def residual(self, probs: np.ndarray) -> float:
+        return float(np.abs(probs @ self.generator).max())
+
+    def _solve_krylov(
+        self,
+        A: sparse.csc_array,
+        b: np.ndarray,
+        method: str,
+        tol: float,
+        maxiter: int,
+        x0: np.ndarray | None = None,
+    ) -> np.ndarray:
+        ilu = splinalg.spilu(A, drop_tol=1e-5, fill_factor=20)
+        preconditioner = splinalg.LinearOperator(A.shape, ilu.solve)
+        counter = {'iterations': 0}
+
+        def count(_):
+            counter['iterations'] += 1
+
+        if x0 is None:
+            x0 = np.full(self.n, 1.0 / self.n)
+        if method == 'gmres':
+            x, info = splinalg.gmres(A, b, x0=x0, rtol=tol, atol=0.0, M=preconditioner,
+                                     restart=50, maxiter=maxiter, callback=count, callback_type='pr_norm')
+        else:
+            x, info = splinalg.bicgstab(A, b, x0=x0, rtol=tol, atol=0.0, M=preconditioner,
+                                        maxiter=maxiter, callback=count)
+        self.iterations = counter['iterations']
+        if info > 0:
+            raise ValueError(f"{method} did not converge within {maxiter} iterations.")
+        if info < 0:
+            raise ValueError(f"{method} failed: illegal input or breakdown.")
+        return x
+
+    def _solve_gauss_seidel(self, tol: float, maxiter: int) -> np.ndarray:
+        # pi Q = 0  <=>  Q^T pi = 0, split Q^T = (D + L) + U and sweep (D + L) pi_new = -U pi_old
+        qt = sparse.csr_array(self.generator.T)
+        lower = sparse.csr_array(sparse.tril(qt, format='csr'))
+        upper = sparse.csr_array(sparse.triu(qt, k=1, format='csr'))
+        probs = np.full(self.n, 1.0 / self.n)
+        for k in range(1, maxiter + 1):
+            updated = splinalg.spsolve_triangular(lower, -(upper @ probs), lower=True)
+            updated /= updated.sum()
+            change = np.abs(updated - probs).max()
+            probs = updated
+            if change < tol:
+                self.iterations = k
+                return probs
+        raise ValueError(f"gauss_seidel did not converge within {maxiter} iterations.")
+
+    def _solve_power(self, tol: float, maxiter: int) -> np.ndarray:
+        rate = float(np.max(-self.generator.diagonal())) * 1.05
+        if rate <= 0:
+            raise ValueError("The generator has no transitions.")
+        transition_t = sparse.csr_array((sparse.eye_array(self.n) + self.generator / rate).T)
+        probs = np.full(self.n, 1.0 / self.n)
+        for k in range(1, maxiter + 1):
+            updated = transition_t @ probs
+            updated /= updated.sum()
+            change = np.abs(updated - probs).max()
+            probs = updated
+            if change < tol:
+                self.iterations = k
+                return probs
+        raise ValueError(f"power did not converge within {maxiter} iterations.")
+
+    def _incoming(self) -> sparse.csc_array:
+        # column s of Q lists every state with a transition into s: the reverse adjacency index
+        if self._incoming_index is None:
+            self._incoming_index = sparse.csc_array(self.generator)
+            self._incoming_index.sort_indices()
+        return self._incoming_index
+
+    def iter_balance_equations(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        incoming = self._incoming()
+        indptr, indices, data = incoming.indptr, incoming.indices, incoming.data
+        out_rates = -self.generator.diagonal()
+        stop = self.n + 1 if stop is None else min(stop, self.n + 1)
+        for s in range(start, min(stop, self.n)):
+            lo, hi = indptr[s], indptr[s + 1]
+            terms = [
+                f"{rate}·P{self.states[t]}"
+                for t, rate in zip(indices[lo:hi].tolist(), data[lo:hi].tolist())
+                if t != s
+            ]
+            outgoing_sum = float(out_rates[s])
+            left = " + ".join(terms) if terms else "0"
+            yield f"{left} = {outgoing_sum}·P{self.states[s]}"
+        if start <= self.n < stop:
+            if self.n <= self.NORMALIZATION_TERMS:
+                yield " + ".join(f"P{s}" for s in self.states) + " = 1"
+            else:
+                yield f"P{self.states[0]} + P{self.states[1]} + … + P{self.states[-1]} = 1"
+
+    def get_balance_equations(self) -> list[str]:
+        return list(self.iter_balance_equations())
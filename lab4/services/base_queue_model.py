@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass(frozen=True)
 class QueueState:
@@ -24,3 +26,15 @@ class BaseQueueModel:
                 if i + j <= self.K:
                     states.append(QueueState(i, j))
         return states
+
+    @property
+    def n_states(self) -> int:
+        return (self.K + 1) * (self.K + 2) // 2
+
+    def state_index(self, i, j):
+        return i * (self.K + 1) - i * (i - 1) // 2 + j
+
+    def state_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        i = np.repeat(np.arange(self.K + 1), np.arange(self.K + 1, 0, -1))
+        j = np.arange(self.n_states) - self.state_index(i, 0)
+        return i, j
@@ -0,0 +1,96 @@
+from bisect import bisect_right
+from typing import Any, Hashable, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from lab4.services.balance_equations_solver import BalanceEquationsSolver
+
+
+class CTMCSimulator:
+    BATCH_SIZE = 65536
+
+    def __init__(
+            self,
+            generator: sparse.sparray | None = None,
+            transitions: dict[Hashable, dict[Hashable, float]] | None = None,
+            states: Sequence[Hashable] | None = None,
+            seed: int | None = None
+    ):
+        if generator is None:
+            if not transitions:
+                raise ValueError("Either a generator or a non-empty transitions dict is required")
+            states = list(transitions.keys())
+            generator = BalanceEquationsSolver._assemble_generator(transitions, states)
+        q = sparse.csr_array(generator)
+        self.n = q.shape[0]
+        self.states = list(states) if states is not None else list(range(self.n))
+        if len(self.states) != self.n:
+            raise ValueError("states must be given for every row of the generator")
+        self.rng = np.random.default_rng(seed)
+
+        rows = np.repeat(np.arange(self.n), np.diff(q.indptr))
+        off = (q.indices != rows) & (q.data > 0)
+        self.exit_rates = np.bincount(rows[off], weights=q.data[off], minlength=self.n)
+
+        # per-state cumulative jump probabilities of the embedded chain, as lists for bisect
+        self._targets: list[list[int]] = [[s] for s in range(self.n)]
+        self._cumulative: list[list[float]] = [[1.0] for _ in range(self.n)]
+        boundaries = np.searchsorted(rows[off], np.arange(self.n + 1))
+        targets, rates = q.indices[off], q.data[off]
+        for s in np.flatnonzero(self.exit_rates > 0):
+            lo, hi = boundaries[s], boundaries[s + 1]
+            cumulative = np.cumsum(rates[lo:hi]) / self.exit_rates[s]
+            cumulative[-1] = 1.0
+            self._targets[s] = targets[lo:hi].tolist()
+            self._cumulative[s] = cumulative.tolist()
+
+    def next_state(self, state: int, u: float) -> int:
+        row = self._cumulative[state]
+        return self._targets[state][min(bisect_right(row, u), len(row) - 1)]
+
+    def _jump_path(self, start: int, size: int) -> tuple[np.ndarray, int]:
+        targets, cumulative = self._targets, self._cumulative
+        path = [0] * size
+        s = start
+        for k, u in enumerate(self.rng.random(size).tolist()):
+            path[k] = s
+            row = cumulative[s]
+            s = targets[s][min(bisect_right(row, u), len(row) - 1)]
+        return np.array(path, dtype=np.int64), s
+
+    def run(self, simulation_time: float, initial_state: int = 0) -> dict[str, Any]:
+        if simulation_time <= 0:
+            raise ValueError("Simulation time must be > 0")
+        if not 0 <= initial_state < self.n:
+            raise ValueError("initial_state must be a state index")
+
+        time_in_state = np.zeros(self.n)
+        visits = np.zeros(self.n, dtype=np.int64)
+        now, state, sojourns = 0.0, initial_state, 0
+
+        while now < simulation_time:
+            path, state = self._jump_path(state, self.BATCH_SIZE)
+            # the jump chain does not depend on holding times, so they are drawn for the whole batch
+            with np.errstate(divide='ignore'):
+                holds = self.rng.standard_exponential(path.size) / self.exit_rates[path]
+            ends = now + np.cumsum(holds)
+            if ends[-1] >= simulation_time:
+                cut = int(np.searchsorted(ends, simulation_time))
+                path = path[:cut + 1]
+                holds = holds[:cut + 1]
+                holds[cut] = simulation_time - (ends[cut - 1] if cut > 0 else now)
+                now = simulation_time
+            else:
+                now = float(ends[-1])
+            time_in_state += np.bincount(path, weights=holds, minlength=self.n)
+            visits += np.bincount(path, minlength=self.n)
+            sojourns += path.size
+
+        return {
+            'state_probabilities': time_in_state / simulation_time,
+            'time_in_state': time_in_state,
+            'visits': visits,
+            'sojourns': sojourns,
+            'simulation_time': simulation_time,
+        }
@@ -0,0 +1,207 @@
+from typing import Any, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from lab4.services.state_encoding import CompositionRanker
+
+
+class MultiClassPriorityModel:
+    """
+    СМО с N классами приоритета (0 — старший), c приборами и R местами в очереди.
+
+    С прерыванием состояние — вектор числа заявок каждого класса n (sum ≤ c + R), на приборах
+    всегда c старших заявок. Поступившая в заполненную систему заявка вытесняет обслуживаемую
+    заявку младшего класса (она теряется), как в двухклассовой PriorityQueueModel.
+    Без прерывания состояние — пара (s, q): заявки на приборах и в очереди по классам,
+    нумеруется смешанной системой счисления rank(s)·|Q| + rank(q).
+    """
+
+    def __init__(
+            self,
+            r: int,
+            arrival_rates: Sequence[float],
+            service_rates: Sequence[float],
+            servers: int = 1,
+            preemptive: bool = True
+    ):
+        if r < 0:
+            raise ValueError("R must be non-negative")
+        if servers < 1:
+            raise ValueError("At least one server is required")
+        self.lambdas = np.asarray(arrival_rates, dtype=float)
+        self.mus = np.asarray(service_rates, dtype=float)
+        if self.lambdas.ndim != 1 or self.lambdas.size == 0 or self.lambdas.shape != self.mus.shape:
+            raise ValueError("arrival_rates and service_rates must be non-empty and of equal length")
+        if np.any(self.lambdas <= 0) or np.any(self.mus <= 0):
+            raise ValueError("All rates must be > 0")
+
+        self.R = r
+        self.c = servers
+        self.K = servers + r
+        self.N = self.lambdas.size
+        self.preemptive = preemptive
+
+        if preemptive:
+            self._ranker = CompositionRanker(self.N, self.K)
+            self._valid_codes = None
+        else:
+            self._service_ranker = CompositionRanker(self.N, self.c)
+            self._queue_ranker = CompositionRanker(self.N, self.R)
+            self._valid_codes = self._non_preemptive_codes()
+        self._states: np.ndarray | None = None
+
+    def _non_preemptive_codes(self) -> np.ndarray:
+        # waiting jobs are only possible when every server is busy
+        service = self._service_ranker.vectors()
+        busy = service.sum(axis=1) == self.c
+        size_q = self._queue_ranker.size
+        s_rank = self._service_ranker.rank(service)
+        codes = np.concatenate((
+            (s_rank[busy][:, None] * size_q + np.arange(size_q)).ravel(),
+            s_rank[~busy] * size_q,
+        ))
+        return np.sort(codes)
+
+    @property
+    def n_states(self) -> int:
+        return self._ranker.size if self.preemptive else int(self._valid_codes.size)
+
+    def state_vectors(self) -> np.ndarray:
+        if self._states is None:
+            if self.preemptive:
+                self._states = self._ranker.vectors()
+            else:
+                size_q = self._queue_ranker.size
+                s_rank, q_rank = np.divmod(self._valid_codes, size_q)
+                self._states = np.column_stack((
+                    self._service_ranker.vectors()[s_rank],
+                    self._queue_ranker.vectors()[q_rank],
+                ))
+        return self._states
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.preemptive:
+            return self._ranker.rank(vectors)
+        v = np.asarray(vectors, dtype=np.int64)
+        codes = self._service_ranker.rank(v[..., :self.N]) * self._queue_ranker.size + self._queue_ranker.rank(v[..., self.N:])
+        return np.searchsorted(self._valid_codes, codes)
+
+    def decode(self, indices: np.ndarray) -> np.ndarray:
+        return self.state_vectors()[indices]
+
+    def in_system(self, vectors: np.ndarray) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.int64)
+        return v if self.preemptive else v[..., :self.N] + v[..., self.N:]
+
+    def in_service(self, vectors: np.ndarray) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.int64)
+        if not self.preemptive:
+            return v[..., :self.N]
+        # the c highest-priority jobs hold the servers
+        reached = np.minimum(np.cumsum(v, axis=-1), self.c)
+        return np.diff(reached, axis=-1, prepend=0)
+
+    def _lowest_in_service(self, service: np.ndarray, k: int) -> np.ndarray:
+        # lowest-priority class strictly below k that occupies a server, -1 if none
+        lower = service[:, k + 1:] > 0
+        if lower.shape[1] == 0:
+            return np.full(service.shape[0], -1)
+        last = self.N - 1 - np.argmax(lower[:, ::-1], axis=1)
+        return np.where(lower.any(axis=1), last, -1)
+
+    def blocked_states(self, k: int) -> np.ndarray:
+        states = self.state_vectors()
+        full = self.in_system(states).sum(axis=1) == self.K
+        if not self.preemptive:
+            return full
+        return full & (self._lowest_in_service(self.in_service(states), k) < 0)
+
+    def transition_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        states = self.state_vectors()
+        src = np.arange(self.n_states)
+        service = self.in_service(states)
+        total = self.in_system(states).sum(axis=1)
+        unit = np.eye(self.N, dtype=np.int64)
+        rows, targets, rates = [], [], []
+
+        def add(mask: np.ndarray, target: np.ndarray, rate: np.ndarray | float) -> None:
+            rows.append(src[mask])
+            targets.append(target)
+            rates.append(np.broadcast_to(rate, (int(mask.sum()),)))
+
+        for k in range(self.N):
+            if self.preemptive:
+                free = total < self.K
+                add(free, states[free] + unit[k], self.lambdas[k])
+                victim = self._lowest_in_service(service, k)
+                push_out = ~free & (victim >= 0)
+                add(push_out, states[push_out] + unit[k] - unit[victim[push_out]], self.lambdas[k])
+
+                serving = service[:, k] > 0
+                add(serving, states[serving] - unit[k], self.mus[k] * service[serving, k])
+            else:
+                idle = service.sum(axis=1) < self.c
+                add(idle, states[idle] + np.concatenate((unit[k], np.zeros(self.N, dtype=np.int64))), self.lambdas[k])
+                waits = ~idle & (total < self.K)
+                add(waits, states[waits] + np.concatenate((np.zeros(self.N, dtype=np.int64), unit[k])), self.lambdas[k])
+
+                serving = service[:, k] > 0
+                target = states[serving].copy()
+                target[:, k] -= 1
+                queue = target[:, self.N:]
+                has_queue = queue.any(axis=1)
+                head = np.argmax(queue > 0, axis=1)[has_queue]
+                moved = np.flatnonzero(has_queue)
+                target[moved, self.N + head] -= 1
+                target[moved, head] += 1
+                add(serving, target, self.mus[k] * service[serving, k])
+
+        rows = np.concatenate(rows)
+        cols = self.encode(np.concatenate(targets))
+        values = np.concatenate(rates).astype(float)
+        return rows, cols, values
+
+    def build_generator(self) -> sparse.csr_array:
+        rows, cols, values = self.transition_arrays()
+        n = self.n_states
+        out_rates = np.bincount(rows, weights=values, minlength=n)
+        diag = np.arange(n)
+        return sparse.csr_array(
+            (np.concatenate((values, -out_rates)), (np.concatenate((rows, diag)), np.concatenate((cols, diag)))),
+            shape=(n, n)
+        )
+
+    def levels(self) -> np.ndarray:
+        return self.in_system(self.state_vectors()).sum(axis=1)
+
+    def class_metrics(self, probs: np.ndarray) -> dict[str, Any]:
+        probs = np.asarray(probs, dtype=float)
+        states = self.state_vectors()
+        counts = probs @ self.in_system(states)
+        busy = probs @ self.in_service(states)
+        blocking = np.array([probs @ self.blocked_states(k) for k in range(self.N)])
+
+        push_out = np.zeros(self.N)
+        if self.preemptive:
+            full = self.in_system(states).sum(axis=1) == self.K
+            service = self.in_service(states)
+            for k in range(self.N):
+                victim = self._lowest_in_service(service, k)
+                hit = full & (victim >= 0)
+                push_out += self.lambdas[k] * np.bincount(victim[hit], weights=probs[hit], minlength=self.N)
+
+        entered = self.lambdas * (1.0 - blocking)
+        queue = counts - busy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sojourn = np.where(entered > 0, counts / entered, np.nan)
+            waiting = np.where(entered > 0, queue / entered, np.nan)
+        return {
+            'blocking': blocking,
+            'push_out_rate': push_out,
+            'entrance_intensities': entered,
+            'throughput': self.mus * busy,
+            'average_counts': counts,
+            'queue_lengths': queue,
+            'times': {'W': sojourn, 'Wq': waiting},
+        }
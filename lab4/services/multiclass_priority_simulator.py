@@ -0,0 +1,114 @@
+import random
+from typing import Any
+
+import numpy as np
+
+from lab4.services.multiclass_priority_model import MultiClassPriorityModel
+
+
+class MultiClassPrioritySimulator:
+    def __init__(self, model: MultiClassPriorityModel, simulation_time: float, seed: int | None = None):
+        if simulation_time <= 0:
+            raise ValueError("Simulation time must be > 0")
+        self.model = model
+        self.T = simulation_time
+        self.rng = random.Random(seed)
+
+        n = model.N
+        self.waiting = [0] * n
+        self.server_class = [-1] * model.c
+        self.server_done = [float('inf')] * model.c
+        self.next_arrival = [0.0] * n
+
+        self.arrivals = [0] * n
+        self.blocked = [0] * n
+        self.pushed_out = [0] * n
+        self.served = [0] * n
+        self.time_in_state = np.zeros(model.n_states)
+        self._index_cache: dict[tuple[int, ...], int] = {}
+
+    def _state_index(self) -> int:
+        in_service = [0] * self.model.N
+        for k in self.server_class:
+            if k >= 0:
+                in_service[k] += 1
+        if self.model.preemptive:
+            key = tuple(s + q for s, q in zip(in_service, self.waiting))
+        else:
+            key = tuple(in_service) + tuple(self.waiting)
+        idx = self._index_cache.get(key)
+        if idx is None:
+            # the simulator walks the same ranked state space as the analytic generator
+            idx = int(self.model.encode(np.array(key)))
+            self._index_cache[key] = idx
+        return idx
+
+    def _start(self, server: int, k: int, now: float) -> None:
+        self.server_class[server] = k
+        self.server_done[server] = now + self.rng.expovariate(self.model.mus[k])
+
+    def _handle_arrival(self, k: int, now: float) -> None:
+        self.arrivals[k] += 1
+        self.next_arrival[k] = now + self.rng.expovariate(self.model.lambdas[k])
+        total = sum(self.waiting) + sum(1 for c in self.server_class if c >= 0)
+
+        if -1 in self.server_class:
+            self._start(self.server_class.index(-1), k, now)
+            return
+
+        victim = max(range(self.model.c), key=self.server_class.__getitem__)
+        lowest = self.server_class[victim]
+        if self.model.preemptive and lowest > k:
+            # exponential service is memoryless: the preempted job simply restarts later
+            if total < self.model.K:
+                self.waiting[lowest] += 1
+            else:
+                self.pushed_out[lowest] += 1
+            self._start(victim, k, now)
+        elif total < self.model.K:
+            self.waiting[k] += 1
+        else:
+            self.blocked[k] += 1
+
+    def _handle_departure(self, server: int, now: float) -> None:
+        self.served[self.server_class[server]] += 1
+        self.server_class[server] = -1
+        self.server_done[server] = float('inf')
+        for h, count in enumerate(self.waiting):
+            if count > 0:
+                self.waiting[h] -= 1
+                self._start(server, h, now)
+                break
+
+    def run(self) -> dict[str, Any]:
+        now = 0.0
+        for k in range(self.model.N):
+            self.next_arrival[k] = self.rng.expovariate(self.model.lambdas[k])
+
+        while True:
+            k = min(range(self.model.N), key=self.next_arrival.__getitem__)
+            server = min(range(self.model.c), key=self.server_done.__getitem__)
+            event_time = min(self.next_arrival[k], self.server_done[server])
+            if event_time > self.T:
+                self.time_in_state[self._state_index()] += self.T - now
+                break
+
+            self.time_in_state[self._state_index()] += event_time - now
+            now = event_time
+            if self.next_arrival[k] <= self.server_done[server]:
+                self._handle_arrival(k, now)
+            else:
+                self._handle_departure(server, now)
+
+        probs = self.time_in_state / self.T
+        arrivals = np.array(self.arrivals)
+        return {
+            'arrivals': arrivals,
+            'blocked': np.array(self.blocked),
+            'pushed_out': np.array(self.pushed_out),
+            'served': np.array(self.served),
+            'blocking': np.divide(self.blocked, arrivals, out=np.zeros(self.model.N), where=arrivals > 0),
+            'state_probabilities': probs,
+            'metrics': self.model.class_metrics(probs),
+            'simulation_time': self.T,
+        }
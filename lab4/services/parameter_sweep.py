@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from lab4.services.balance_equations_solver import BalanceEquationsSolver
+from lab4.services.performance_metrics import PerformanceMetrics
+from lab4.services.priority_queue_model import PriorityQueueModel
+
+
+def _sweep_chunk(r: int, method: str, tol: float, maxiter: int | None, points: np.ndarray) -> np.ndarray:
+    return ParameterSweep(r, method=method, tol=tol, maxiter=maxiter, n_workers=1).solve_points(points)
+
+
+class ParameterSweep:
+    RATE_NAMES = ('lambda1', 'lambda2', 'mu1', 'mu2')
+    METRICS = (
+        ('blocking', 'I'),
+        ('blocking', 'II'),
+        ('entrance_intensities', 'lambda1_in'),
+        ('entrance_intensities', 'lambda2_in'),
+        ('throughput', 'I'),
+        ('throughput', 'II'),
+        ('average_counts', 'L1'),
+        ('average_counts', 'L2'),
+        ('queue_lengths', 'Q1'),
+        ('queue_lengths', 'Q2'),
+        ('times', 'W1'),
+        ('times', 'W2'),
+        ('times', 'Wq1'),
+        ('times', 'Wq2'),
+        ('times', 'W'),
+        ('times', 'Wq'),
+    )
+
+    def __init__(
+            self,
+            r: int,
+            method: str = 'auto',
+            tol: float = BalanceEquationsSolver.DEFAULT_TOL,
+            maxiter: int | None = None,
+            n_workers: int | None = None
+    ):
+        template = PriorityQueueModel(r, 1.0, 1.0, 1.0, 1.0)
+        self.r = r
+        self.n = template.n_states
+        self.method = method if method != 'auto' else BalanceEquationsSolver.default_method(self.n, structured=True)
+        if self.method not in BalanceEquationsSolver.METHODS:
+            raise ValueError(f"Unknown solver method '{method}'.")
+        self.tol = tol
+        self.maxiter = maxiter
+        self.n_workers = max(1, n_workers or os.cpu_count() or 1)
+
+        i, j = template.state_arrays()
+        self.i, self.j = i, j
+        self.states = list(zip(i.tolist(), j.tolist()))
+        self.levels = i + j
+        self.rows, cols, self.kinds = template.transition_pattern()
+
+        # CSR structure is fixed for a given R; remember where each COO entry lands in csr.data
+        diag = np.arange(self.n)
+        nnz = self.rows.size + self.n
+        pattern = sparse.csr_array(
+            (np.arange(1, nnz + 1, dtype=float), (np.concatenate((self.rows, diag)), np.concatenate((cols, diag)))),
+            shape=(self.n, self.n)
+        )
+        self._order = pattern.data.astype(np.int64) - 1
+        self._pattern = pattern
+
+    def generator(self, rates: Sequence[float]) -> sparse.csr_array:
+        values = np.asarray(rates, dtype=float)[self.kinds]
+        out_rates = np.bincount(self.rows, weights=values, minlength=self.n)
+        q = self._pattern.copy()
+        q.data = np.concatenate((values, -out_rates))[self._order]
+        return q
+
+    def _metric_row(self, probs: np.ndarray, rates: np.ndarray) -> np.ndarray:
+        metrics = PerformanceMetrics(probs, *rates, i=self.i, j=self.j)
+        served = metrics.served_probabilities()
+        report = {
+            'blocking': metrics.blocking_probabilities(),
+            'entrance_intensities': metrics.entrance_intensities(),
+            'throughput': {k: served[k]['throughput'] for k in served},
+            'average_counts': metrics.average_counts(),
+            'queue_lengths': metrics.average_queue_lengths(),
+            'times': metrics.average_times(),
+        }
+        return np.array([
+            np.nan if report[group][key] is None else report[group][key]
+            for group, key in self.METRICS
+        ])
+
+    def solve_points(self, points: np.ndarray) -> np.ndarray:
+        points = np.asarray(points, dtype=float).reshape(-1, 4)
+        if np.any(points <= 0):
+            raise ValueError("All rates must be > 0")
+        result = np.empty((points.shape[0], len(self.METRICS)))
+        probs = None
+        for k, rates in enumerate(points):
+            solver = BalanceEquationsSolver(generator=self.generator(rates), states=self.states, levels=self.levels)
+            # the neighbouring point's solution is a warm start for Krylov methods; direct methods ignore it
+            probs = solver.solve_vector(self.method, self.tol, self.maxiter, x0=probs)
+            result[k] = self._metric_row(probs, rates)
+        return result
+
+    def run(
+            self,
+            lambda1: float | Sequence[float],
+            lambda2: float | Sequence[float],
+            mu1: float | Sequence[float],
+            mu2: float | Sequence[float]
+    ) -> dict[str, Any]:
+        axes = [np.atleast_1d(np.asarray(v, dtype=float)) for v in (lambda1, lambda2, mu1, mu2)]
+        shape = tuple(a.size for a in axes)
+        # C-order keeps consecutive points neighbours in the last axis, which is what warm starts rely on
+        points = np.stack([g.ravel() for g in np.meshgrid(*axes, indexing='ij')], axis=1)
+
+        chunks = np.array_split(points, min(self.n_workers, points.shape[0]))
+        if len(chunks) == 1:
+            rows = [self.solve_points(chunks[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                rows = list(executor.map(
+                    _sweep_chunk,
+                    [self.r] * len(chunks),
+                    [self.method] * len(chunks),
+                    [self.tol] * len(chunks),
+                    [self.maxiter] * len(chunks),
+                    chunks,
+                ))
+        values = np.concatenate(rows, axis=0)
+
+        metrics: dict[str, dict[str, np.ndarray]] = {}
+        for col, (group, key) in enumerate(self.METRICS):
+            metrics.setdefault(group, {})[key] = values[:, col].reshape(shape)
+        return {
+            'r': self.r,
+            'method': self.method,
+            'axes': dict(zip(self.RATE_NAMES, axes)),
+            'shape': shape,
+            **metrics,
+        }
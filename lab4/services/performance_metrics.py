@@ -1,40 +1,61 @@
+import numpy as np
+
+
 class PerformanceMetrics:
     def __init__(
         self,
-        probs: dict[tuple[int, int], float],
+        probs: dict[tuple[int, int], float] | np.ndarray,
         lambda1: float,
         lambda2: float,
         mu1: float,
         mu2: float,
+        i: np.ndarray | None = None,
+        j: np.ndarray | None = None,
     ):
-        self.P = probs
+        if isinstance(probs, dict):
+            states = np.array(list(probs.keys()), dtype=np.int64).reshape(-1, 2)
+            i, j = states[:, 0], states[:, 1]
+            probs = np.fromiter(probs.values(), dtype=float, count=len(probs))
+        elif i is None or j is None:
+            raise ValueError("i and j arrays are required for a probability vector")
+        self.p = np.asarray(probs, dtype=float)
+        self.i = np.asarray(i, dtype=np.int64)
+        self.j = np.asarray(j, dtype=np.int64)
+        if not (self.p.shape == self.i.shape == self.j.shape):
+            raise ValueError("probs, i and j must have the same length")
         self.l1 = lambda1
         self.l2 = lambda2
         self.m1 = mu1
         self.m2 = mu2
 
-        self.K = max(i + j for (i, j) in self.P.keys())
+        self.K = int((self.i + self.j).max())
+
+        full = (self.i + self.j) == self.K
+        server_I = self.i > 0
+        server_II = ~server_I & (self.j > 0)
+
+        p = self.p
+        self._p_block_I = float(p @ (full & server_I))
+        self._p_block_II = float(p @ full)
+        self._p_server_I = float(p @ server_I)
+        self._p_server_II = float(p @ server_II)
+        self._L1 = float(p @ self.i)
+        self._L2 = float(p @ self.j)
 
     def blocking_probabilities(self) -> dict[str, float]:
-        P = self.P
-        P_block_I = sum(p for (i, j), p in P.items() if (i + j == self.K and i > 0))
-        P_block_II = sum(p for (i, j), p in P.items() if (i + j == self.K))
-        return {"I": float(P_block_I), "II": float(P_block_II)}
+        return {"I": self._p_block_I, "II": self._p_block_II}
 
     def entrance_intensities(self) -> dict[str, float]:
-        blocks = self.blocking_probabilities()
-        lam1_in = self.l1 * (1.0 - blocks['I'])
-        lam2_in = self.l2 * (1.0 - blocks['II'])
+        lam1_in = self.l1 * (1.0 - self._p_block_I)
+        lam2_in = self.l2 * (1.0 - self._p_block_II)
         return {"lambda1_in": float(lam1_in), "lambda2_in": float(lam2_in)}
 
     def served_probabilities(self) -> dict[str, dict[str, float | None]]:
-        P = self.P
-        prob_server_I = sum(p for (i, j), p in P.items() if i > 0)
-        prob_server_II = sum(p for (i, j), p in P.items() if i == 0 and j > 0)
-        throughput_I = self.m1 * prob_server_I
-        throughput_II = self.m2 * prob_server_II
-        lam1_in = self.entrance_intensities()['lambda1_in']
-        lam2_in = self.entrance_intensities()['lambda2_in']
+        throughput_I = self.m1 * self._p_server_I
+        throughput_II = self.m2 * self._p_server_II
+        entr = self.entrance_intensities()
+        lam1_in = entr['lambda1_in']
+        lam2_in = entr['lambda2_in']
         res = {
             'I': {
                 'throughput': float(throughput_I),
@@ -50,10 +71,7 @@ class PerformanceMetrics:
         return res
 
     def average_counts(self) -> dict[str, float]:
-        P = self.P
-        L1 = sum(i * p for (i, j), p in P.items())
-        L2 = sum(j * p for (i, j), p in P.items())
-        return {'L1': float(L1), 'L2': float(L2)}
+        return {'L1': self._L1, 'L2': self._L2}
 
     def average_queue_lengths(self) -> dict[str, float]:
         """
@@ -63,16 +81,12 @@ class PerformanceMetrics:
         Для Q1 проще:
             Если i > 0, то одна заявка I на приборе, остальные (i - 1) — в очереди.
             Если i == 0 → max(0, -1) = 0.
+        Поэтому из среднего числа заявок достаточно вычесть вероятность занятости прибора заявкой своего типа:
+            Q1 = L1 - P(i > 0), Q2 = L2 - P(i == 0, j > 0).
         """
-        P = self.P
-        Q1 = sum(max(0, i - 1) * p for (i, j), p in P.items())
-        Q2 = 0.0
-        for (i, j), p in P.items():
-            if i > 0:
-                Q2 += j * p
-            else:
-                Q2 += max(0, j - 1) * p
-        return {'Q1': float(Q1), 'Q2': float(Q2)}
+        Q1 = self._L1 - self._p_server_I
+        Q2 = self._L2 - self._p_server_II
+        return {'Q1': float(max(Q1, 0.0)), 'Q2': float(max(Q2, 0.0))}
 
     def average_times(self) -> dict[str, float | None]:
         entr = self.entrance_intensities()
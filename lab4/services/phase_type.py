@@ -0,0 +1,136 @@
+import math
+import random
+from bisect import bisect_right
+from functools import partial
+from typing import Callable, Sequence
+
+import numpy as np
+
+
+class PhaseType:
+    """
+    Фазовое распределение PH(α, T): время до поглощения цепи с начальным вектором α и подгенератором T.
+
+    t0 = -T·1 — интенсивности поглощения из фаз. Экспоненциальное, Эрланга, гиперэкспоненциальное
+    и Кокса распределения — частные случаи.
+    """
+
+    def __init__(self, alpha: Sequence[float], subgenerator: Sequence[Sequence[float]], name: str = 'PH'):
+        self.alpha = np.asarray(alpha, dtype=float)
+        self.T = np.atleast_2d(np.asarray(subgenerator, dtype=float))
+        m = self.alpha.size
+        if self.T.shape != (m, m):
+            raise ValueError("The subgenerator must be square and match the initial vector.")
+        if np.any(self.alpha < 0) or not math.isclose(self.alpha.sum(), 1.0, abs_tol=1e-9):
+            raise ValueError("The initial vector must be a probability vector (no atom at zero).")
+        off = self.T - np.diag(np.diag(self.T))
+        if np.any(off < 0) or np.any(np.diag(self.T) >= 0):
+            raise ValueError("The subgenerator needs negative diagonal and non-negative off-diagonal entries.")
+        self.t0 = -self.T.sum(axis=1)
+        if np.any(self.t0 < -1e-12):
+            raise ValueError("Rows of the subgenerator must not sum to a positive value.")
+        self.t0 = np.maximum(self.t0, 0.0)
+        self.name = name
+        self.n_phases = m
+        self.mean = float(self.alpha @ np.linalg.solve(-self.T, np.ones(m)))
+
+        # per-phase exit rate and cumulative jump probabilities; the last target m means absorption
+        self._exit = (-np.diag(self.T)).tolist()
+        self._initial = np.cumsum(self.alpha).tolist()
+        self._targets: list[list[int]] = []
+        self._cumulative: list[list[float]] = []
+        for k in range(m):
+            probs = np.append(off[k], self.t0[k]) / -self.T[k, k]
+            nonzero = np.flatnonzero(probs > 0)
+            self._targets.append(nonzero.tolist())
+            self._cumulative.append(np.cumsum(probs[nonzero]).tolist())
+        self._rate = self._exit[0] if m == 1 else None
+
+    @classmethod
+    def exponential(cls, rate: float) -> 'PhaseType':
+        if rate <= 0:
+            raise ValueError("The rate must be > 0")
+        return cls([1.0], [[-rate]], name='Exp')
+
+    @classmethod
+    def erlang(cls, k: int, mean: float) -> 'PhaseType':
+        if k < 1 or mean <= 0:
+            raise ValueError("Erlang needs k >= 1 phases and a positive mean")
+        rate = k / mean
+        t = np.diag(np.full(k, -rate)) + np.diag(np.full(k - 1, rate), 1)
+        alpha = np.zeros(k)
+        alpha[0] = 1.0
+        return cls(alpha, t, name=f'E{k}')
+
+    @classmethod
+    def hyperexponential(cls, probs: Sequence[float], rates: Sequence[float]) -> 'PhaseType':
+        if len(probs) != len(rates) or any(r <= 0 for r in rates):
+            raise ValueError("Hyperexponential needs one positive rate per branch probability")
+        return cls(probs, np.diag(-np.asarray(rates, dtype=float)), name=f'H{len(rates)}')
+
+    @classmethod
+    def coxian(cls, rates: Sequence[float], continue_probs: Sequence[float]) -> 'PhaseType':
+        """continue_probs[k] — вероятность перейти из фазы k в k + 1, а не завершиться."""
+        rates = np.asarray(rates, dtype=float)
+        continue_probs = np.asarray(continue_probs, dtype=float)
+        if continue_probs.size != rates.size - 1 or np.any(rates <= 0):
+            raise ValueError("Coxian needs positive rates and one continuation probability per inner phase")
+        if np.any((continue_probs < 0) | (continue_probs > 1)):
+            raise ValueError("Continuation probabilities must be in [0, 1]")
+        t = np.diag(-rates) + np.diag(rates[:-1] * continue_probs, 1)
+        alpha = np.zeros(rates.size)
+        alpha[0] = 1.0
+        return cls(alpha, t, name=f'Cox{rates.size}')
+
+    @classmethod
+    def fit(cls, mean: float, scv: float) -> 'PhaseType':
+        """
+        Двухмоментная подгонка: при scv < 1 — смесь Эрланга порядков k - 1 и k с общей интенсивностью
+        (Tijms), при scv > 1 — H2 со сбалансированными средними; среднее и scv совпадают точно.
+        """
+        if mean <= 0 or scv <= 0:
+            raise ValueError("Mean and squared coefficient of variation must be > 0")
+        if math.isclose(scv, 1.0):
+            return cls.exponential(1.0 / mean)
+        if scv < 1:
+            k = max(2, math.ceil(1.0 / scv - 1e-9))
+            # with probability p the chain starts in the second phase, i.e. only k - 1 phases are passed
+            p = (k * scv - math.sqrt(max(k * (1.0 + scv) - k * k * scv, 0.0))) / (1.0 + scv)
+            p = min(max(p, 0.0), 1.0)
+            rate = (k - p) / mean
+            t = np.diag(np.full(k, -rate)) + np.diag(np.full(k - 1, rate), 1)
+            alpha = np.zeros(k)
+            alpha[0], alpha[1] = 1.0 - p, p
+            return cls(alpha, t, name=f'E{k}' if p < 1e-12 else f'E{k - 1},{k}')
+        p = 0.5 * (1.0 + math.sqrt((scv - 1.0) / (scv + 1.0)))
+        return cls.hyperexponential([p, 1.0 - p], [2.0 * p / mean, 2.0 * (1.0 - p) / mean])
+
+    @property
+    def rate(self) -> float:
+        return 1.0 / self.mean
+
+    @property
+    def scv(self) -> float:
+        second = 2.0 * float(self.alpha @ np.linalg.solve(self.T @ self.T, np.ones(self.n_phases)))
+        return second / self.mean ** 2 - 1.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self._rate is not None:
+            return rng.expovariate(self._rate)
+        m = self.n_phases
+        phase = min(bisect_right(self._initial, rng.random()), m - 1)
+        total = 0.0
+        while phase < m:
+            total += rng.expovariate(self._exit[phase])
+            row = self._cumulative[phase]
+            phase = self._targets[phase][min(bisect_right(row, rng.random()), len(row) - 1)]
+        return total
+
+    def sampler(self, rng: random.Random) -> Callable[[], float]:
+        # a bound C-level expovariate keeps the exponential case as cheap as before
+        if self._rate is not None:
+            return partial(rng.expovariate, self._rate)
+        return partial(self.sample, rng)
+
+    def __repr__(self) -> str:
+        return f"{self.name}(mean={self.mean:.4g}, scv={self.scv:.4g})"
@@ -0,0 +1,221 @@
+from typing import Any
+
+import numpy as np
+from scipy import sparse
+
+from lab4.services.base_queue_model import BaseQueueModel
+from lab4.services.phase_type import PhaseType
+
+
+class PhaseTypePriorityModel:
+    """
+    Двухклассовая СМО с абсолютным приоритетом, фазовыми потоками прибытий и фазовым обслуживанием.
+
+    Состояние — (i, j, a1, a2, s): числа заявок классов, фазы процессов восстановления прибытий
+    и фаза текущего обслуживания (для свободного прибора одна фиктивная фаза). Макросостояние (i, j)
+    задаёт блок размера n_a1·n_a2·d(i, j); каждый вид переходов — кронекерово произведение матрицы
+    по фазам прибытий и матрицы по фазам обслуживания, одинаковое для всех блоков своей группы.
+    Прерванная заявка II возвращается в очередь и обслуживается заново, в заполненной системе теряется.
+    """
+
+    # beyond this the sparse factorisation takes tens of seconds (77k states: ~90 s)
+    MAX_STATES = 20000
+
+    @staticmethod
+    def count_states(r: int, arrival_phases: int, service_I_phases: int, service_II_phases: int) -> int:
+        """Размер пространства состояний без его построения: 1 пустое, K(K+1)/2 с обслуживанием I, K с II."""
+        k = r + 1
+        return arrival_phases * (1 + service_I_phases * k * (k + 1) // 2 + service_II_phases * k)
+
+    def __init__(
+            self,
+            r: int,
+            arrival_I: PhaseType,
+            arrival_II: PhaseType,
+            service_I: PhaseType,
+            service_II: PhaseType
+    ):
+        n_states = self.count_states(
+            r, arrival_I.n_phases * arrival_II.n_phases, service_I.n_phases, service_II.n_phases
+        )
+        if n_states > self.MAX_STATES:
+            raise ValueError(
+                f"The phase-type model would have {n_states} states; at most {self.MAX_STATES} are supported."
+            )
+        self.macro = BaseQueueModel(r)
+        self.R = self.macro.R
+        self.K = self.macro.K
+        self.arrival_I = arrival_I
+        self.arrival_II = arrival_II
+        self.service_I = service_I
+        self.service_II = service_II
+
+        i, j = self.macro.state_arrays()
+        self._i, self._j = i, j
+        self._serve_I = i > 0
+        self._serve_II = (i == 0) & (j > 0)
+        self._idle = (i + j) == 0
+        self.n_arrival_phases = arrival_I.n_phases * arrival_II.n_phases
+        self._service_phases = np.where(
+            self._serve_I, service_I.n_phases, np.where(self._serve_II, service_II.n_phases, 1)
+        )
+        self._sizes = self.n_arrival_phases * self._service_phases
+        self._offsets = np.concatenate(([0], np.cumsum(self._sizes)))
+        self.n_states = int(self._offsets[-1])
+
+    def state_arrays(self) -> dict[str, np.ndarray]:
+        macro = np.repeat(np.arange(self.macro.n_states), self._sizes)
+        local = np.arange(self.n_states) - self._offsets[macro]
+        d = self._service_phases[macro]
+        arrival = local // d
+        return {
+            'macro': macro,
+            'i': self._i[macro],
+            'j': self._j[macro],
+            'a1': arrival // self.arrival_II.n_phases,
+            'a2': arrival % self.arrival_II.n_phases,
+            's': local % d,
+        }
+
+    def levels(self) -> np.ndarray:
+        return np.repeat(self._i + self._j, self._sizes)
+
+    def _blocks(self, src: np.ndarray, dst: np.ndarray, arrival_part: np.ndarray, service_part: np.ndarray):
+        if src.size == 0:
+            return None
+        block = sparse.coo_array(sparse.kron(sparse.csr_array(arrival_part), sparse.csr_array(service_part)))
+        rows = (self._offsets[src][:, None] + block.row[None, :]).ravel()
+        cols = (self._offsets[dst][:, None] + block.col[None, :]).ravel()
+        values = np.tile(block.data, src.size)
+        return rows, cols, values
+
+    def transition_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        a1, a2, s1, s2 = self.arrival_I, self.arrival_II, self.service_I, self.service_II
+        eye1, eye2 = np.eye(a1.n_phases), np.eye(a2.n_phases)
+        eye_a = np.eye(self.n_arrival_phases)
+        arrival_phase = np.kron(a1.T, eye2) + np.kron(eye1, a2.T)
+        arrival_I = np.kron(np.outer(a1.t0, a1.alpha), eye2)
+        arrival_II = np.kron(eye1, np.outer(a2.t0, a2.alpha))
+        start_I, start_II = s1.alpha[None, :], s2.alpha[None, :]
+        done_I, done_II = s1.t0[:, None], s2.t0[:, None]
+
+        i, j = self._i, self._j
+        index = self.macro.state_index
+        total = i + j
+        free = total < self.K
+        idle, serve_I, serve_II = self._idle, self._serve_I, self._serve_II
+        eye = {'idle': np.eye(1), 'I': np.eye(s1.n_phases), 'II': np.eye(s2.n_phases)}
+        groups = []
+
+        # arrival phases move without an arrival; blocked arrivals only restart their phase
+        for mask, key in ((idle, 'idle'), (serve_I, 'I'), (serve_II, 'II')):
+            src = np.flatnonzero(mask)
+            groups.append(self._blocks(src, src, arrival_phase, eye[key]))
+        for mask, part, key in (
+                (serve_I & ~free, arrival_I, 'I'),
+                (serve_I & ~free, arrival_II, 'I'),
+                (serve_II & ~free, arrival_II, 'II'),
+        ):
+            src = np.flatnonzero(mask)
+            groups.append(self._blocks(src, src, part, eye[key]))
+
+        # class I arrivals: start service, join the queue, or preempt class II
+        src = np.flatnonzero(idle)
+        groups.append(self._blocks(src, index(i[src] + 1, j[src]), arrival_I, start_I))
+        src = np.flatnonzero(serve_I & free)
+        groups.append(self._blocks(src, index(i[src] + 1, j[src]), arrival_I, eye['I']))
+        src = np.flatnonzero(serve_II)
+        # the preempted job goes back to the queue or, in a full system, is lost
+        kept = np.where(free[src], j[src], j[src] - 1)
+        groups.append(self._blocks(src, index(np.ones_like(kept), kept), arrival_I, np.ones((s2.n_phases, 1)) @ start_I))
+
+        # class II arrivals
+        src = np.flatnonzero(idle)
+        groups.append(self._blocks(src, index(i[src], j[src] + 1), arrival_II, start_II))
+        for mask, key in ((serve_I & free, 'I'), (serve_II & free, 'II')):
+            src = np.flatnonzero(mask)
+            groups.append(self._blocks(src, index(i[src], j[src] + 1), arrival_II, eye[key]))
+
+        # service phases and completions
+        src = np.flatnonzero(serve_I)
+        groups.append(self._blocks(src, src, eye_a, s1.T))
+        src = np.flatnonzero(serve_II)
+        groups.append(self._blocks(src, src, eye_a, s2.T))
+        for mask, part in (
+                (serve_I & (i > 1), done_I @ start_I),
+                (serve_I & (i == 1) & (j > 0), done_I @ start_II),
+                (serve_I & (i == 1) & (j == 0), done_I),
+        ):
+            src = np.flatnonzero(mask)
+            groups.append(self._blocks(src, index(i[src] - 1, j[src]), eye_a, part))
+        for mask, part in ((serve_II & (j > 1), done_II @ start_II), (serve_II & (j == 1), done_II)):
+            src = np.flatnonzero(mask)
+            groups.append(self._blocks(src, index(i[src], j[src] - 1), eye_a, part))
+
+        groups = [g for g in groups if g is not None]
+        rows = np.concatenate([g[0] for g in groups])
+        cols = np.concatenate([g[1] for g in groups])
+        values = np.concatenate([g[2] for g in groups])
+        # diagonals of the phase matrices and restarts into the same phase are dropped, the diagonal is rebuilt
+        keep = (rows != cols) & (values > 0)
+        return rows[keep], cols[keep], values[keep]
+
+    def build_generator(self) -> sparse.csr_array:
+        rows, cols, values = self.transition_arrays()
+        n = self.n_states
+        out_rates = np.bincount(rows, weights=values, minlength=n)
+        diag = np.arange(n)
+        return sparse.csr_array(
+            (np.concatenate((values, -out_rates)), (np.concatenate((rows, diag)), np.concatenate((cols, diag)))),
+            shape=(n, n)
+        )
+
+    def metrics(self, probs: np.ndarray) -> dict[str, Any]:
+        """Метрики по стационарному вектору; блокировка — доля заблокированных прибытий, а не доля времени."""
+        st = self.state_arrays()
+        i, j = st['i'], st['j']
+        full = (i + j) == self.K
+        serve_I = i > 0
+        serve_II = (i == 0) & (j > 0)
+
+        rate_I = self.arrival_I.t0[st['a1']]
+        rate_II = self.arrival_II.t0[st['a2']]
+        lam1 = float(probs @ rate_I)
+        lam2 = float(probs @ rate_II)
+        p_block_I = float(probs @ (rate_I * (full & serve_I))) / lam1
+        p_block_II = float(probs @ (rate_II * full)) / lam2
+        lam1_in = lam1 * (1.0 - p_block_I)
+        lam2_in = lam2 * (1.0 - p_block_II)
+
+        # the phase index of other blocks may exceed this class's phases, so it is clipped before the lookup
+        s = st['s']
+        throughput_I = float(probs @ np.where(serve_I, self.service_I.t0[np.minimum(s, self.service_I.n_phases - 1)], 0.0))
+        throughput_II = float(probs @ np.where(serve_II, self.service_II.t0[np.minimum(s, self.service_II.n_phases - 1)], 0.0))
+
+        L1, L2 = float(probs @ i), float(probs @ j)
+        Q1 = max(L1 - float(probs @ serve_I), 0.0)
+        Q2 = max(L2 - float(probs @ serve_II), 0.0)
+        lam_in = lam1_in + lam2_in
+
+        marginal = np.bincount(st['macro'], weights=probs, minlength=self.macro.n_states)
+        return {
+            'states': {(int(a), int(b)): float(p) for a, b, p in zip(self._i, self._j, marginal)},
+            'blocking': {'I': p_block_I, 'II': p_block_II},
+            'entrance_intensities': {'lambda1_in': lam1_in, 'lambda2_in': lam2_in},
+            'served': {
+                'I': {'throughput': throughput_I, 'of_arrivals': throughput_I / lam1,
+                      'of_entered': throughput_I / lam1_in if lam1_in > 0 else None},
+                'II': {'throughput': throughput_II, 'of_arrivals': throughput_II / lam2,
+                       'of_entered': throughput_II / lam2_in if lam2_in > 0 else None},
+            },
+            'average_counts': {'L1': L1, 'L2': L2},
+            'queue_lengths': {'Q1': Q1, 'Q2': Q2},
+            'times': {
+                'W1': L1 / lam1_in if lam1_in > 0 else None,
+                'W2': L2 / lam2_in if lam2_in > 0 else None,
+                'Wq1': Q1 / lam1_in if lam1_in > 0 else None,
+                'Wq2': Q2 / lam2_in if lam2_in > 0 else None,
+                'W': (L1 + L2) / lam_in if lam_in > 0 else None,
+                'Wq': (Q1 + Q2) / lam_in if lam_in > 0 else None,
+            },
+        }
@@ -1,3 +1,8 @@
+from typing import Iterator
+
+import numpy as np
+from scipy import sparse
+
 from lab4.services.base_queue_model import BaseQueueModel
 
 
@@ -13,8 +18,21 @@ class PriorityQueueModel(BaseQueueModel):
         self.m1 = float(mu1)
         self.m2 = float(mu2)
 
-        self.states = self.get_states()
-        self.transitions = self._build_transitions()
+        self._states = None
+        self._transitions = None
+        self._description_order = None
+
+    @property
+    def states(self):
+        if self._states is None:
+            self._states = self.get_states()
+        return self._states
+
+    @property
+    def transitions(self) -> dict[tuple[int, int], dict[tuple[int, int], float]]:
+        if self._transitions is None:
+            self._transitions = self._build_transitions()
+        return self._transitions
 
     def _build_transitions(self) -> dict[tuple[int, int], dict[tuple[int, int], float]]:
         trans: dict[tuple[int, int], dict[tuple[int, int], float]] = {}
@@ -48,39 +66,81 @@ class PriorityQueueModel(BaseQueueModel):
     def get_transitions(self) -> dict[tuple[int, int], dict[tuple[int, int], float]]:
         return self.transitions
 
+    def transition_pattern(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # off-diagonal structure of Q; rate kind indexes rate_vector(): 0 — λ₁, 1 — λ₂, 2 — μ₁, 3 — μ₂
+        i, j = self.state_arrays()
+        src = np.arange(self.n_states)
+        total = i + j
+        free = total < self.K
+        preempt_loss = (total == self.K) & (i == 0)
+        serve_I = i > 0
+        serve_II = (i == 0) & (j > 0)
+
+        sources = (src[free], src[preempt_loss], src[free], src[serve_I], src[serve_II])
+        targets = (
+            self.state_index(i[free] + 1, j[free]),
+            self.state_index(np.ones_like(i[preempt_loss]), np.full_like(j[preempt_loss], self.K - 1)),
+            self.state_index(i[free], j[free] + 1),
+            self.state_index(i[serve_I] - 1, j[serve_I]),
+            self.state_index(i[serve_II], j[serve_II] - 1),
+        )
+        kinds = (0, 0, 1, 2, 3)
+
+        rows = np.concatenate(sources)
+        cols = np.concatenate(targets)
+        rate_kinds = np.concatenate([np.full(s.size, k, dtype=np.int8) for s, k in zip(sources, kinds)])
+        return rows, cols, rate_kinds
+
+    def rate_vector(self) -> np.ndarray:
+        return np.array([self.l1, self.l2, self.m1, self.m2])
+
+    def transition_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows, cols, kinds = self.transition_pattern()
+        return rows, cols, self.rate_vector()[kinds]
+
+    def build_generator(self) -> sparse.csr_array:
+        rows, cols, values = self.transition_arrays()
+        n = self.n_states
+        out_rates = np.bincount(rows, weights=values, minlength=n)
+        diag = np.arange(n)
+        return sparse.csr_array(
+            (np.concatenate((values, -out_rates)), (np.concatenate((rows, diag)), np.concatenate((cols, diag)))),
+            shape=(n, n)
+        )
+
+    def _ordered_pattern(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._description_order is None:
+            rows, cols, kinds = self.transition_pattern()
+            # per source state, list transitions in the order _build_transitions inserts them
+            order = np.lexsort((kinds, rows))
+            self._description_order = rows[order], cols[order], kinds[order]
+        return self._description_order
+
+    def iter_transition_descriptions(self, start: int = 0, stop: int | None = None) -> Iterator[dict]:
+        rows, cols, kinds = self._ordered_pattern()
+        i, j = self.state_arrays()
+        rates = self.rate_vector()
+        labels = ("λ₁", "λ₂", "μ₁", "μ₂")
+
+        stop = rows.size if stop is None else min(stop, rows.size)
+        for k in range(start, stop):
+            src, dst, kind = int(rows[k]), int(cols[k]), int(kinds[k])
+            from_state = (int(i[src]), int(j[src]))
+            label = labels[kind]
+            if kind == 0 and from_state[0] == 0 and from_state[1] == self.K:
+                label = "λ₁ (preemption, loss)"
+            yield {
+                'from': from_state,
+                'to': (int(i[dst]), int(j[dst])),
+                'label': label,
+                'rate': round(float(rates[kind]), 6)
+            }
+
+    def n_transitions(self) -> int:
+        return int(self._ordered_pattern()[0].size)
+
     def get_transition_descriptions(self) -> list[dict]:
-        desc = []
-        for (i, j), outs in self.transitions.items():
-            from_state = (i, j)
-            for (ni, nj), rate in outs.items():
-                if i == 0 and j == self.K and ni == 1 and nj == self.K - 1:
-                    label = "λ₁ (preemption, loss)"
-                elif ni == i + 1 and nj == j:
-                    label = "λ₁"
-                elif ni == i and nj == j + 1:
-                    label = "λ₂"
-                elif ni == i - 1 and nj == j:
-                    label = "μ₁"
-                elif ni == i and nj == j - 1:
-                    label = "μ₂"
-                else:
-                    if abs(rate - self.l1) < 1e-9:
-                        label = "λ₁"
-                    elif abs(rate - self.l2) < 1e-9:
-                        label = "λ₂"
-                    elif abs(rate - self.m1) < 1e-9:
-                        label = "μ₁"
-                    elif abs(rate - self.m2) < 1e-9:
-                        label = "μ₂"
-                    else:
-                        label = f"? ({rate})"
-                desc.append({
-                    'from': from_state,
-                    'to': (ni, nj),
-                    'label': label,
-                    'rate': round(rate, 6)
-                })
-        return desc
+        return list(self.iter_transition_descriptions())
 
     def debug_print(self) -> None:
         for state, outs in sorted(self.transitions.items()):
@@ -1,15 +1,22 @@
-import heapq
 import random
-from typing import Any, NamedTuple
+from typing import Any
 
+import numpy as np
 
-class Event(NamedTuple):
-    time: float
-    event_type: str
-    job_type: str | None = None
+from lab4.services.phase_type import PhaseType
+from lab4.services.trace_recorder import TraceRecorder
 
 
 class PriorityQueueSimulator:
+    # event codes double as slots of the calendar: one next arrival per stream and one departure
+    ARRIVAL_I = 0
+    ARRIVAL_II = 1
+    DEPARTURE = 2
+
+    IDLE = 0
+    JOB_I = 1
+    JOB_II = 2
+
     def __init__(
         self,
         r: int,
@@ -18,7 +25,12 @@ class PriorityQueueSimulator:
         mu1: float,
         mu2: float,
         simulation_time: float,
-        seed: int | None = None
+        seed: int | None = None,
+        trace: TraceRecorder | None = None,
+        arrival_I: PhaseType | None = None,
+        arrival_II: PhaseType | None = None,
+        service_I: PhaseType | None = None,
+        service_II: PhaseType | None = None
     ):
         if r < 0:
             raise ValueError("R must be non-negative")
@@ -34,171 +46,176 @@ class PriorityQueueSimulator:
         self.mu1 = mu1
         self.mu2 = mu2
         self.T = simulation_time
+        # phase-type laws replace the exponential ones given by the rates; the rates stay as nominal values
+        self.interarrival = [
+            arrival_I or PhaseType.exponential(lambda1),
+            arrival_II or PhaseType.exponential(lambda2),
+        ]
+        self.services = {
+            self.JOB_I: service_I or PhaseType.exponential(mu1),
+            self.JOB_II: service_II or PhaseType.exponential(mu2),
+        }
 
-        if seed is not None:
-            random.seed(seed)
+        # arrival streams are indexed by their calendar slot, service streams by job code, so two configurations
+        # run with the same seed see the same uniforms per event type (common random numbers)
+        streams = [random.Random(int(child.generate_state(1, dtype=np.uint64)[0]))
+                   for child in np.random.SeedSequence(seed).spawn(4)]
+        self.arrival_streams = streams[:2]
+        self.service_streams = {self.JOB_I: streams[2], self.JOB_II: streams[3]}
+        self._draw_arrival = [law.sampler(stream) for law, stream in zip(self.interarrival, self.arrival_streams)]
+        self._draw_service = {job: law.sampler(self.service_streams[job]) for job, law in self.services.items()}
 
-        self.server_busy = False
-        self.server_job_type: str | None = None
-        self.queue_I: list[float] = []
-        self.queue_II: list[float] = []
+        self.server_job = self.IDLE
+        self.queue_I = 0
+        self.queue_II = 0
 
         self.arrivals_I = 0
         self.arrivals_II = 0
         self.blocked_I = 0
         self.blocked_II = 0
+        self.pushed_out_II = 0
         self.served_I = 0
         self.served_II = 0
-        self.area_i = 0.0
-        self.area_j = 0.0
+        self.busy_I = 0.0
+        self.busy_II = 0.0
         self.area_q1 = 0.0
         self.area_q2 = 0.0
         self.last_event_time = 0.0
 
-        self.event_queue: list[Event] = []
-
-    def _get_service_time(self, job_type: str) -> float:
-        return random.expovariate(self.mu1 if job_type == 'I' else self.mu2)
+        # time spent in every (i, j), flattened as i * (K + 1) + j
+        self.occupancy = [0.0] * (self.K + 1) ** 2
+        self.trace = trace
 
-    def _get_arrival_time(self, stream: str) -> float:
-        return random.expovariate(self.lambda1 if stream == 'I' else self.lambda2)
+        self.calendar = [float('inf')] * 3
+        self.started = False
 
-    def _current_i(self) -> int:
-        return (1 if self.server_job_type == 'I' else 0) + len(self.queue_I)
-
-    def _current_j(self) -> int:
-        return (1 if self.server_job_type == 'II' else 0) + len(self.queue_II)
-
-    def _current_total(self) -> int:
-        return self._current_i() + self._current_j()
+    def _schedule_departure(self, current_time: float, job: int) -> None:
+        # overwriting the slot cancels a pending departure of a preempted job
+        self.server_job = job
+        self.calendar[self.DEPARTURE] = current_time + self._draw_service[job]()
 
     def _update_areas(self, current_time: float) -> None:
         dt = current_time - self.last_event_time
         if dt <= 0:
             return
 
-        i = self._current_i()
-        j = self._current_j()
-
-        self.area_i += i * dt
-        self.area_j += j * dt
-
-        q1 = len(self.queue_I)
-
-        if self.server_job_type == 'I':
-            q2 = len(self.queue_II)
-        elif self.server_job_type == 'II':
-            q2 = len(self.queue_II)
-        else:
-            q2 = 0
-
-        self.area_q1 += q1 * dt
-        self.area_q2 += q2 * dt
-
+        # all queued jobs of either class wait while the server is busy, so Q1 and Q2 are the counters;
+        # L1 and L2 add the server occupancy, accumulated separately
+        self.area_q1 += self.queue_I * dt
+        self.area_q2 += self.queue_II * dt
+        i, j = self.queue_I, self.queue_II
+        if self.server_job == self.JOB_I:
+            self.busy_I += dt
+            i += 1
+        elif self.server_job == self.JOB_II:
+            self.busy_II += dt
+            j += 1
+        self.occupancy[i * (self.K + 1) + j] += dt
         self.last_event_time = current_time
 
     def _start_service(self, current_time: float) -> None:
-        if len(self.queue_I) > 0:
-            self.queue_I.pop(0)
-            self.server_job_type = 'I'
-            self.server_busy = True
-            service_time = self._get_service_time('I')
-            heapq.heappush(self.event_queue, Event(current_time + service_time, 'departure', 'I'))
-        elif len(self.queue_II) > 0:
-            self.queue_II.pop(0)
-            self.server_job_type = 'II'
-            self.server_busy = True
-            service_time = self._get_service_time('II')
-            heapq.heappush(self.event_queue, Event(current_time + service_time, 'departure', 'II'))
+        if self.queue_I > 0:
+            self.queue_I -= 1
+            self._schedule_departure(current_time, self.JOB_I)
+        elif self.queue_II > 0:
+            self.queue_II -= 1
+            self._schedule_departure(current_time, self.JOB_II)
         else:
-            self.server_busy = False
-            self.server_job_type = None
+            self.server_job = self.IDLE
+            self.calendar[self.DEPARTURE] = float('inf')
 
     def _handle_arrival_I(self, current_time: float) -> None:
         self.arrivals_I += 1
-        total = self._current_total()
-
-        if self.server_busy and self.server_job_type == 'II':
-            self.server_busy = False
-            self.server_job_type = None
 
-            if len(self.queue_I) + len(self.queue_II) < self.R:
-                self.queue_II.append(current_time)
-            else:
-                self.blocked_II += 1
-
-            self.server_busy = True
-            self.server_job_type = 'I'
-            service_time = self._get_service_time('I')
-            heapq.heappush(self.event_queue, Event(current_time + service_time, 'departure', 'I'))
-        elif total < self.K:
-            if not self.server_busy:
-                self.server_busy = True
-                self.server_job_type = 'I'
-                service_time = self._get_service_time('I')
-                heapq.heappush(self.event_queue, Event(current_time + service_time, 'departure', 'I'))
+        if self.server_job == self.JOB_II:
+            # the preempted job returns to the queue or, in a full system, is lost; it was admitted, so not blocked
+            if self.queue_I + self.queue_II < self.R:
+                self.queue_II += 1
             else:
-                self.queue_I.append(current_time)
+                self.pushed_out_II += 1
+            self._schedule_departure(current_time, self.JOB_I)
+        elif self.server_job == self.IDLE:
+            self._schedule_departure(current_time, self.JOB_I)
+        elif 1 + self.queue_I + self.queue_II < self.K:
+            self.queue_I += 1
         else:
             self.blocked_I += 1
 
-        next_arrival = current_time + self._get_arrival_time('I')
-        heapq.heappush(self.event_queue, Event(next_arrival, 'arrival_I'))
+        self.calendar[self.ARRIVAL_I] = current_time + self._draw_arrival[self.ARRIVAL_I]()
 
     def _handle_arrival_II(self, current_time: float) -> None:
         self.arrivals_II += 1
-        total = self._current_total()
-
-        if total < self.K:
-            if not self.server_busy:
-                self.server_busy = True
-                self.server_job_type = 'II'
-                service_time = self._get_service_time('II')
-                heapq.heappush(self.event_queue, Event(current_time + service_time, 'departure', 'II'))
-            else:
-                self.queue_II.append(current_time)
+
+        if self.server_job == self.IDLE:
+            self._schedule_departure(current_time, self.JOB_II)
+        elif 1 + self.queue_I + self.queue_II < self.K:
+            self.queue_II += 1
         else:
             self.blocked_II += 1
 
-        next_arrival = current_time + self._get_arrival_time('II')
-        heapq.heappush(self.event_queue, Event(next_arrival, 'arrival_II'))
-
-    def _handle_departure(self, current_time: float, job_type: str) -> None:
-        if self.server_job_type != job_type:
-            return
+        self.calendar[self.ARRIVAL_II] = current_time + self._draw_arrival[self.ARRIVAL_II]()
 
-        if job_type == 'I':
+    def _handle_departure(self, current_time: float) -> None:
+        if self.server_job == self.JOB_I:
             self.served_I += 1
         else:
             self.served_II += 1
-
-        self.server_busy = False
-        self.server_job_type = None
-
-        if len(self.queue_I) > 0 or len(self.queue_II) > 0:
-            self._start_service(current_time)
-
-    def run(self) -> dict[str, Any]:
-        first_I = self._get_arrival_time('I')
-        first_II = self._get_arrival_time('II')
-        heapq.heappush(self.event_queue, Event(first_I, 'arrival_I'))
-        heapq.heappush(self.event_queue, Event(first_II, 'arrival_II'))
-
-        while self.event_queue:
-            event = heapq.heappop(self.event_queue)
-            if event.time > self.T:
+        self._start_service(current_time)
+
+    def advance(self, until: float) -> None:
+        calendar = self.calendar
+        if not self.started:
+            calendar[self.ARRIVAL_I] = self._draw_arrival[self.ARRIVAL_I]()
+            calendar[self.ARRIVAL_II] = self._draw_arrival[self.ARRIVAL_II]()
+            self.started = True
+        record = self.trace.record if self.trace is not None else None
+
+        while True:
+            t_arrival_I, t_arrival_II, t_departure = calendar
+            if t_arrival_I <= t_arrival_II and t_arrival_I <= t_departure:
+                event_time, code = t_arrival_I, self.ARRIVAL_I
+            elif t_arrival_II <= t_departure:
+                event_time, code = t_arrival_II, self.ARRIVAL_II
+            else:
+                event_time, code = t_departure, self.DEPARTURE
+            if event_time > until:
                 break
 
-            self._update_areas(event.time)
+            self._update_areas(event_time)
 
-            if event.event_type == 'arrival_I':
-                self._handle_arrival_I(event.time)
-            elif event.event_type == 'arrival_II':
-                self._handle_arrival_II(event.time)
-            elif event.event_type == 'departure':
-                self._handle_departure(event.time, event.job_type)
+            if code == self.ARRIVAL_I:
+                self._handle_arrival_I(event_time)
+            elif code == self.ARRIVAL_II:
+                self._handle_arrival_II(event_time)
+            else:
+                self._handle_departure(event_time)
+
+            if record is not None:
+                record(
+                    event_time, code,
+                    self.queue_I + (self.server_job == self.JOB_I),
+                    self.queue_II + (self.server_job == self.JOB_II),
+                )
+
+        self._update_areas(until)
+
+    def counters(self) -> tuple[float, ...]:
+        return (
+            self.busy_I, self.busy_II, self.area_q1, self.area_q2,
+            self.arrivals_I, self.arrivals_II, self.blocked_I, self.blocked_II,
+        )
+
+    def state_probabilities(self) -> dict[tuple[int, int], float]:
+        """Доли времени в состояниях (i, j) в порядке состояний аналитической модели."""
+        elapsed = self.last_event_time
+        width = self.K + 1
+        return {
+            (i, j): self.occupancy[i * width + j] / elapsed if elapsed > 0 else 0.0
+            for i in range(width) for j in range(width - i)
+        }
 
-        self._update_areas(self.T)
+    def run(self) -> dict[str, Any]:
+        self.advance(self.T)
 
         lambda1_in = self.arrivals_I - self.blocked_I
         lambda2_in = self.arrivals_II - self.blocked_II
@@ -206,8 +223,8 @@ class PriorityQueueSimulator:
         P_block_I = self.blocked_I / self.arrivals_I if self.arrivals_I > 0 else 0.0
         P_block_II = self.blocked_II / self.arrivals_II if self.arrivals_II > 0 else 0.0
 
-        L1 = self.area_i / self.T
-        L2 = self.area_j / self.T
+        L1 = (self.busy_I + self.area_q1) / self.T
+        L2 = (self.busy_II + self.area_q2) / self.T
         Q1 = self.area_q1 / self.T
         Q2 = self.area_q2 / self.T
 
@@ -230,6 +247,7 @@ class PriorityQueueSimulator:
                 'I': {'throughput': self.served_I / self.T},
                 'II': {'throughput': self.served_II / self.T},
             },
+            'pushed_out': {'II': self.pushed_out_II / self.T},
             'average_counts': {'L1': L1, 'L2': L2},
             'queue_lengths': {'Q1': Q1, 'Q2': Q2},
             'times': {
@@ -239,4 +257,6 @@ class PriorityQueueSimulator:
             },
             'simulation_time': self.T,
             'arrivals': {'I': self.arrivals_I, 'II': self.arrivals_II},
+            'state_probabilities': self.state_probabilities(),
+            'trace': self.trace.events() if self.trace is not None else None,
         }
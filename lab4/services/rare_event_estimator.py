@@ -0,0 +1,148 @@
+import math
+import random
+from typing import Any
+
+import numpy as np
+from scipy import sparse, stats
+
+from lab4.services.ctmc_simulator import CTMCSimulator
+
+
+class RareEventBlockingEstimator:
+    """
+    Оценка малых вероятностей блокировки по регенеративным циклам с выборкой по значимости.
+
+    P(A) = E[время в A за цикл] / E[длина цикла], цикл — от пустого состояния до возврата в него.
+    Числитель считается по вложенной цепи с наклоном: интенсивности переходов вверх по уровню
+    умножаются на α, вниз — делятся на α, пока цикл не достиг верхнего уровня; дальше цепь
+    идёт с исходными интенсивностями. Вес пути — произведение отношений вероятностей переходов.
+    Знаменатель не редок и оценивается обычными циклами.
+
+    Цикл обрывается после MAX_CYCLE_STEPS переходов, а все циклы вместе — после MAX_STEPS; оборванные
+    циклы в оценку не входят и считаются в truncated_cycles, что смещает оценку.
+    """
+
+    MAX_CYCLE_STEPS = 200000
+    MAX_STEPS = 5000000
+
+    def __init__(
+            self,
+            generator: sparse.sparray,
+            levels: np.ndarray,
+            targets: dict[str, np.ndarray],
+            tilt: float,
+            initial_state: int = 0,
+            seed: int | None = None
+    ):
+        if tilt < 1:
+            raise ValueError("The tilt must be >= 1: it pushes the chain towards the top level.")
+        q = sparse.coo_array(generator)
+        self.levels = np.asarray(levels, dtype=np.int64)
+        self.top = int(self.levels.max())
+        self.targets = {name: np.asarray(mask, dtype=bool) for name, mask in targets.items()}
+        self.tilt = float(tilt)
+        self.initial_state = initial_state
+        self.rng = random.Random(seed)
+
+        off = q.row != q.col
+        rows, cols, rates = q.row[off], q.col[off], q.data[off]
+        step = self.levels[cols] - self.levels[rows]
+        n = q.shape[0]
+        tilted = sparse.csr_array((rates * self.tilt ** step, (rows, cols)), shape=(n, n))
+        tilted = tilted - sparse.diags_array(tilted.sum(axis=1))
+
+        self.original = CTMCSimulator(generator=generator, seed=seed)
+        self.tilted = CTMCSimulator(generator=tilted, seed=seed)
+        self.mean_holding = np.divide(1.0, self.original.exit_rates, out=np.zeros(n), where=self.original.exit_rates > 0)
+        # p(x, y) / p'(x, y) = α^(-Δlevel) · q'(x) / q(x)
+        self._exit_ratio = np.divide(
+            self.tilted.exit_rates, self.original.exit_rates, out=np.ones(n), where=self.original.exit_rates > 0
+        ).tolist()
+        self._levels = self.levels.tolist()
+        self._holding = self.mean_holding.tolist()
+        self._target_lists = {name: mask.tolist() for name, mask in self.targets.items()}
+
+    def _cycle(self, importance: bool, max_steps: int) -> tuple[float, dict[str, float], bool, int, bool]:
+        levels, holding = self._levels, self._holding
+        state = self.initial_state
+        weight, length, hit = 1.0, 0.0, False
+        in_target = {name: 0.0 for name in self._target_lists}
+
+        for steps in range(1, max_steps + 1):
+            length += holding[state]
+            for name, mask in self._target_lists.items():
+                if mask[state]:
+                    in_target[name] += holding[state]
+            if levels[state] == self.top:
+                hit = True
+            if importance and not hit:
+                target = self.tilted.next_state(state, self.rng.random())
+                weight *= self.tilt ** (levels[state] - levels[target]) * self._exit_ratio[state]
+            else:
+                target = self.original.next_state(state, self.rng.random())
+            state = target
+            if state == self.initial_state:
+                return length, {name: weight * value for name, value in in_target.items()}, hit, steps, True
+
+        return length, in_target, hit, max_steps, False
+
+    def _cycles(self, count: int, importance: bool, budget: int) -> tuple[list[tuple], int, int]:
+        """До count циклов в пределах budget переходов: завершённые циклы, число оборванных и затраченные шаги."""
+        done, truncated, used = [], 0, 0
+        while len(done) + truncated < count and used < budget:
+            length, in_target, hit, steps, complete = self._cycle(
+                importance, min(self.MAX_CYCLE_STEPS, budget - used)
+            )
+            used += steps
+            if complete:
+                done.append((length, in_target, hit))
+            else:
+                truncated += 1
+        return done, truncated, used
+
+    def run(self, cycles: int = 2000, plain_cycles: int | None = None, confidence: float = 0.95) -> dict[str, Any]:
+        if cycles < 2:
+            raise ValueError("At least two cycles are required.")
+        plain_cycles = plain_cycles or cycles
+
+        # the plain cycles get at most half of the budget, the tilted ones the rest
+        plain, plain_truncated, used = self._cycles(plain_cycles, False, self.MAX_STEPS // 2)
+        tilted, tilted_truncated, _ = self._cycles(cycles, True, self.MAX_STEPS - used)
+        result = {
+            'blocking': {},
+            'cycles': len(tilted),
+            'plain_cycles': len(plain),
+            'requested_cycles': cycles,
+            'truncated_cycles': plain_truncated + tilted_truncated,
+            'max_cycle_steps': self.MAX_CYCLE_STEPS,
+            'tilt': self.tilt,
+            'hit_fraction': sum(hit for _, _, hit in tilted) / len(tilted) if tilted else 0.0,
+            'confidence': confidence,
+        }
+        if len(plain) < 2 or len(tilted) < 2:
+            return result
+
+        lengths = np.array([length for length, _, _ in plain])
+        weighted = {name: np.array([in_target[name] for _, in_target, _ in tilted]) for name in self.targets}
+        plain_cycles, cycles = len(plain), len(tilted)
+
+        z = float(stats.norm.ppf((1 + confidence) / 2))
+        mean_length = float(lengths.mean())
+        var_length = float(lengths.var(ddof=1)) / plain_cycles
+        estimates = {}
+        for name, values in weighted.items():
+            numerator = float(values.mean())
+            var_numerator = float(values.var(ddof=1)) / cycles
+            estimate = numerator / mean_length
+            # delta method for a ratio of two independent sample means
+            std_error = math.sqrt(var_numerator / mean_length ** 2 + numerator ** 2 * var_length / mean_length ** 4)
+            estimates[name] = {
+                'estimate': estimate,
+                'half_width': z * std_error,
+                'lower': max(0.0, estimate - z * std_error),
+                'upper': estimate + z * std_error,
+                'relative_error': std_error / estimate if estimate > 0 else math.inf,
+            }
+
+        result['blocking'] = estimates
+        return result
@@ -0,0 +1,112 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+from scipy import stats
+
+from lab4.services.priority_queue_simulator import PriorityQueueSimulator
+
+
+def _run_replication(params: dict[str, float], simulation_time: float, seed: int) -> dict[str, Any]:
+    return PriorityQueueSimulator(**params, simulation_time=simulation_time, seed=seed).run()
+
+
+class ReplicationRunner:
+    METRICS = (
+        ('blocking', 'I'),
+        ('blocking', 'II'),
+        ('average_counts', 'L1'),
+        ('average_counts', 'L2'),
+        ('queue_lengths', 'Q1'),
+        ('queue_lengths', 'Q2'),
+        ('times', 'W1'),
+        ('times', 'W2'),
+        ('times', 'Wq1'),
+        ('times', 'Wq2'),
+        ('times', 'W'),
+        ('times', 'Wq'),
+    )
+
+    def __init__(
+            self,
+            r: int,
+            lambda1: float,
+            lambda2: float,
+            mu1: float,
+            mu2: float,
+            simulation_time: float,
+            replications: int = 10,
+            confidence: float = 0.95,
+            n_workers: int | None = None,
+            seed: int | None = None
+    ):
+        if replications < 2:
+            raise ValueError("At least two replications are required for a confidence interval.")
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence level must be in (0, 1).")
+        self.params = {'r': r, 'lambda1': lambda1, 'lambda2': lambda2, 'mu1': mu1, 'mu2': mu2}
+        self.simulation_time = simulation_time
+        self.replications = replications
+        self.confidence = confidence
+        self.n_workers = max(1, min(n_workers or os.cpu_count() or 1, replications))
+        self.seed = seed
+
+    def _seeds(self) -> list[int]:
+        # spawned children give statistically independent streams for every replication
+        children = np.random.SeedSequence(self.seed).spawn(self.replications)
+        return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+    def _map(self, worker: Callable[..., Any], *shared: Any) -> list[Any]:
+        """worker(*shared, seed) для каждой репликации; в пуле процессов, если разрешено больше одного."""
+        seeds = self._seeds()
+        if self.n_workers == 1:
+            return [worker(*shared, s) for s in seeds]
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            return list(executor.map(worker, *([arg] * len(seeds) for arg in shared), seeds))
+
+    def run(self) -> dict[str, Any]:
+        m = self.replications
+        runs = self._map(_run_replication, self.params, self.simulation_time)
+
+        t_quantile = float(stats.t.ppf((1 + self.confidence) / 2, m - 1))
+        rows = []
+        for group, key in self.METRICS:
+            values = np.array([np.nan if run[group][key] is None else run[group][key] for run in runs], dtype=float)
+            values = values[~np.isnan(values)]
+            if values.size < 2:
+                rows.append({'group': group, 'key': key, 'mean': None, 'half_width': None,
+                             'lower': None, 'upper': None, 'n': int(values.size)})
+                continue
+            mean = float(values.mean())
+            half_width = t_quantile * float(values.std(ddof=1)) / math.sqrt(values.size)
+            rows.append({
+                'group': group,
+                'key': key,
+                'mean': mean,
+                'half_width': half_width,
+                'lower': mean - half_width,
+                'upper': mean + half_width,
+                'n': int(values.size),
+            })
+        return {
+            'replications': m,
+            'confidence': self.confidence,
+            'simulation_time': self.simulation_time,
+            'metrics': rows,
+        }
+
+    @staticmethod
+    def compare(summary: dict[str, Any], analytic: dict[str, Any]) -> dict[str, Any]:
+        covered = 0
+        for row in summary['metrics']:
+            value = analytic.get(row['group'], {}).get(row['key'])
+            row['analytic'] = value
+            row['covered'] = (
+                None if value is None or row['mean'] is None
+                else bool(row['lower'] <= value <= row['upper'])
+            )
+            covered += bool(row['covered'])
+        summary['covered'] = covered
+        return summary
@@ -0,0 +1,68 @@
+import copy
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import numpy as np
+
+
+class ReportCache:
+    """
+    Ограниченный LRU-кэш аналитических отчётов.
+
+    Вектор стационарных вероятностей хранится без потерь: байты float64 переставляются по разрядам
+    (сначала все младшие байты, затем следующие — как shuffle в Blosc) и сжимаются zlib;
+    остальное — небольшие словари метрик.
+    """
+
+    def __init__(self, max_entries: int = 32, level: int = 6):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.level = level
+        self._entries: OrderedDict[Hashable, tuple[bytes, int, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> tuple[np.ndarray, dict[str, Any]] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        packed, n, data = entry
+        return self._unpack(packed, n), copy.deepcopy(data)
+
+    def _pack(self, vector: np.ndarray) -> bytes:
+        shuffled = vector.view(np.uint8).reshape(vector.size, vector.itemsize).T
+        return zlib.compress(shuffled.tobytes(), self.level)
+
+    @staticmethod
+    def _unpack(packed: bytes, n: int) -> np.ndarray:
+        shuffled = np.frombuffer(zlib.decompress(packed), dtype=np.uint8).reshape(8, n)
+        return shuffled.T.copy().view(np.float64).ravel()
+
+    def put(self, key: Hashable, vector: np.ndarray, data: dict[str, Any]) -> None:
+        vector = np.ascontiguousarray(vector, dtype=np.float64)
+        entry = (self._pack(vector), vector.size, copy.deepcopy(data))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stored_bytes(self) -> int:
+        with self._lock:
+            return sum(len(packed) for packed, _, _ in self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,131 @@
+from typing import Any
+
+import numpy as np
+
+from lab4.services.balance_equations_solver import BalanceEquationsSolver
+from lab4.services.performance_metrics import PerformanceMetrics
+from lab4.services.priority_queue_model import PriorityQueueModel
+
+
+class SensitivityAnalyzer:
+    """
+    Производные метрик по λ₁, λ₂, μ₁, μ₂ через сопряжённые системы на одном LU-разложении.
+
+    Нормированная система B^T p = e, где B — Q с последним столбцом из единиц. Для функционала m = p·f
+    dm/dθ = -p (dQ/dθ)' y, где B y = f, а штрих — обнулённый последний столбец. Q линейна по интенсивностям,
+    поэтому dQ/dθ — шаблон переходов одного вида. Для дискретного R даётся разность m(R + 1) - m(R).
+    """
+
+    PARAMETERS = ('lambda1', 'lambda2', 'mu1', 'mu2')
+    METRICS = ('P_block_I', 'P_block_II', 'L1', 'L2', 'Q1', 'Q2', 'W1', 'W2', 'Wq1', 'Wq2', 'W', 'Wq')
+
+    def __init__(self, model: PriorityQueueModel):
+        if model.n_states > BalanceEquationsSolver.DIRECT_LIMIT:
+            raise ValueError("Sensitivity analysis needs a sparse LU factor; the state space is too large.")
+        self.model = model
+        i, j = model.state_arrays()
+        self.solver = BalanceEquationsSolver(
+            generator=model.build_generator(),
+            states=list(zip(i.tolist(), j.tolist())),
+            levels=i + j,
+        )
+
+    def _functionals(self) -> np.ndarray:
+        i, j = self.model.state_arrays()
+        full = (i + j) == self.model.K
+        server_I = i > 0
+        server_II = ~server_I & (j > 0)
+        # columns: P_block_I, P_block_II, P(server I), P(server II), L1, L2
+        return np.column_stack((full & server_I, full, server_I, server_II, i, j)).astype(float)
+
+    @staticmethod
+    def _derived(base: np.ndarray, grads: np.ndarray, rates: np.ndarray) -> dict[str, tuple[float, np.ndarray]]:
+        # forward-mode chain rule: every quantity is (value, gradient over PARAMETERS)
+        values = {}
+        names = ('P_block_I', 'P_block_II', 'server_I', 'server_II', 'L1', 'L2')
+        for k, name in enumerate(names):
+            values[name] = (float(base[k]), grads[k])
+
+        def sub(a, b):
+            return a[0] - b[0], a[1] - b[1]
+
+        def add(a, b):
+            return a[0] + b[0], a[1] + b[1]
+
+        def div(a, b):
+            if b[0] <= 0:
+                return None
+            return a[0] / b[0], (a[1] * b[0] - a[0] * b[1]) / b[0] ** 2
+
+        unit = np.eye(len(rates))
+        lam1_in = (rates[0] * (1 - base[0]), unit[0] * (1 - base[0]) - rates[0] * grads[0])
+        lam2_in = (rates[1] * (1 - base[1]), unit[1] * (1 - base[1]) - rates[1] * grads[1])
+        lam_in = add(lam1_in, lam2_in)
+
+        values['Q1'] = sub(values['L1'], values['server_I'])
+        values['Q2'] = sub(values['L2'], values['server_II'])
+        values['W1'] = div(values['L1'], lam1_in)
+        values['W2'] = div(values['L2'], lam2_in)
+        values['Wq1'] = div(values['Q1'], lam1_in)
+        values['Wq2'] = div(values['Q2'], lam2_in)
+        values['W'] = div(add(values['L1'], values['L2']), lam_in)
+        values['Wq'] = div(add(values['Q1'], values['Q2']), lam_in)
+        return values
+
+    def _neighbour_metrics(self) -> dict[str, float | None]:
+        m = self.model
+        neighbour = PriorityQueueModel(m.R + 1, m.l1, m.l2, m.m1, m.m2)
+        i, j = neighbour.state_arrays()
+        solver = BalanceEquationsSolver(
+            generator=neighbour.build_generator(),
+            states=list(zip(i.tolist(), j.tolist())),
+            levels=i + j,
+        )
+        probs = solver.solve_vector(solver.default_method(neighbour.n_states, structured=True))
+        metrics = PerformanceMetrics(probs, m.l1, m.l2, m.m1, m.m2, i=i, j=j)
+        blocking = metrics.blocking_probabilities()
+        return {
+            'P_block_I': blocking['I'],
+            'P_block_II': blocking['II'],
+            **metrics.average_counts(),
+            **metrics.average_queue_lengths(),
+            **metrics.average_times(),
+        }
+
+    def analyze(self, include_r: bool = True) -> dict[str, Any]:
+        lu = self.solver.factorize()
+        n = self.model.n_states
+        b = np.zeros(n)
+        b[-1] = 1.0
+        probs = np.maximum(lu.solve(b), 0.0)
+        probs /= probs.sum()
+
+        f = self._functionals()
+        # adjoint solves B y = f with the same factor (A = B^T)
+        y = lu.solve(f, trans='T')
+        y[-1] = 0.0
+        rows, cols, kinds = self.model.transition_pattern()
+        flow = probs[rows, None] * (y[cols] - y[rows])
+        grads = -np.stack([flow[kinds == k].sum(axis=0) for k in range(len(self.PARAMETERS))], axis=1)
+
+        rates = self.model.rate_vector()
+        derived = self._derived(probs @ f, grads, rates)
+        neighbour = self._neighbour_metrics() if include_r else {}
+
+        metrics = {}
+        for name in self.METRICS:
+            entry = derived[name]
+            if entry is None:
+                metrics[name] = None
+                continue
+            value, gradient = entry
+            row = {'value': value}
+            row.update({p: float(g) for p, g in zip(self.PARAMETERS, gradient)})
+            if include_r:
+                row['R'] = None if neighbour.get(name) is None else neighbour[name] - value
+            metrics[name] = row
+
+        return {
+            'parameters': self.PARAMETERS + (('R',) if include_r else ()),
+            'metrics': metrics,
+        }
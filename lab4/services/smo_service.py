@@ -1,38 +1,177 @@
-from typing import Any
+import math
+from typing import Any, Iterator
+
+import numpy as np
 
 from lab4.services.balance_equations_solver import BalanceEquationsSolver
+from lab4.services.ctmc_simulator import CTMCSimulator
+from lab4.services.paired_comparison import PairedComparison
 from lab4.services.performance_metrics import PerformanceMetrics
+from lab4.services.phase_type import PhaseType
+from lab4.services.phase_type_priority_model import PhaseTypePriorityModel
 from lab4.services.priority_queue_model import PriorityQueueModel
 from lab4.services.priority_queue_simulator import PriorityQueueSimulator
+from lab4.services.rare_event_estimator import RareEventBlockingEstimator
+from lab4.services.replication_runner import ReplicationRunner
+from lab4.services.report_cache import ReportCache
+from lab4.services.sensitivity_analyzer import SensitivityAnalyzer
+from lab4.services.steady_state_estimator import SteadyStateEstimator
+from lab4.services.trace_recorder import TraceRecorder
+from lab4.services.transient_analyzer import TransientAnalyzer
 
 
 class SMOService:
+    DETAIL_PAGE_SIZE = 200
+    # shared by all instances of the process: analytic reports depend only on the model and the solver settings
+    report_cache = ReportCache(max_entries=32)
+
     def __init__(self, r: int, lambda1: float, lambda2: float, mu1: float, mu2: float):
         self.model = PriorityQueueModel(r, lambda1, lambda2, mu1, mu2)
 
-    def analyze(self) -> dict[str, Any]:
-        transitions = self.model.get_transitions()
-        solver = BalanceEquationsSolver(transitions)
-        probs = solver.solve()
-        metrics = PerformanceMetrics(probs, self.model.l1, self.model.l2, self.model.m1, self.model.m2)
+    def analyze(
+            self,
+            solver_method: str = 'auto',
+            tol: float = BalanceEquationsSolver.DEFAULT_TOL,
+            details_page: int = 1,
+            use_cache: bool = True
+    ) -> dict[str, Any]:
+        n = self.model.n_states
+        i, j = self.model.state_arrays()
+        states = list(zip(i.tolist(), j.tolist()))
+        if solver_method == 'auto':
+            solver_method = BalanceEquationsSolver.default_method(n, structured=True)
+        key = (self.model.R, self.model.l1, self.model.l2, self.model.m1, self.model.m2, solver_method, tol)
 
-        transition_desc = self.model.get_transition_descriptions()
-        balance_eqs = solver.get_balance_equations()
+        cached = self.report_cache.get(key) if use_cache else None
+        if cached is None:
+            solver = BalanceEquationsSolver(generator=self.model.build_generator(), states=states, levels=i + j)
+            vector = solver.solve_vector(solver_method, tol=tol)
+            metrics = PerformanceMetrics(vector, self.model.l1, self.model.l2, self.model.m1, self.model.m2, i=i, j=j)
+            summary = {
+                'solver': {
+                    'method': solver_method,
+                    'iterations': solver.iterations,
+                    'n_states': n,
+                    'residual': solver.residual(vector),
+                },
+                'blocking': metrics.blocking_probabilities(),
+                'entrance_intensities': metrics.entrance_intensities(),
+                'served': metrics.served_probabilities(),
+                'average_counts': metrics.average_counts(),
+                'queue_lengths': metrics.average_queue_lengths(),
+                'times': metrics.average_times(),
+            }
+            if use_cache:
+                self.report_cache.put(key, vector, summary)
+        else:
+            solver = None
+            vector, summary = cached
+
+        # transitions and equations are formatted lazily, one page at a time
+        n_transitions = self.model.n_transitions()
+        size = self.DETAIL_PAGE_SIZE
+        pages = max(1, math.ceil(max(n_transitions, n + 1) / size))
+        page = min(max(1, details_page), pages)
+        start, stop = (page - 1) * size, page * size
 
         report: dict[str, Any] = {
-            'states': probs,
-            'blocking': metrics.blocking_probabilities(),
-            'entrance_intensities': metrics.entrance_intensities(),
-            'served': metrics.served_probabilities(),
-            'average_counts': metrics.average_counts(),
-            'queue_lengths': metrics.average_queue_lengths(),
-            'times': metrics.average_times(),
-            'transitions': transition_desc,
-            'balance_equations': balance_eqs,
+            'states': dict(zip(states, vector.tolist())),
+            **summary,
+            'details': {
+                'page': page,
+                'pages': pages,
+                'page_size': size,
+                'start': start,
+                'n_states': n,
+                'n_transitions': n_transitions,
+                'n_equations': n + 1,
+            },
+            'transitions': self.model.iter_transition_descriptions(start, stop),
+            'balance_equations': self._balance_equations(solver, states, start, stop),
         }
         return report
 
-    def simulate(self, simulation_time: float, seed: int | None = None) -> dict:
+    def _balance_equations(
+            self,
+            solver: BalanceEquationsSolver | None,
+            states: list[tuple[int, int]],
+            start: int,
+            stop: int
+    ) -> Iterator[str]:
+        # on a cache hit the generator is only assembled if the page is actually rendered
+        if solver is None:
+            i, j = self.model.state_arrays()
+            solver = BalanceEquationsSolver(generator=self.model.build_generator(), states=states, levels=i + j)
+        yield from solver.iter_balance_equations(start, stop)
+
+    def phase_type_laws(self, arrival_scv: float = 1.0, service_scv: float = 1.0) -> dict[str, PhaseType]:
+        """Two-moment phase-type fits keeping the model's means, for both classes."""
+        m = self.model
+        return {
+            'arrival_I': PhaseType.fit(1.0 / m.l1, arrival_scv),
+            'arrival_II': PhaseType.fit(1.0 / m.l2, arrival_scv),
+            'service_I': PhaseType.fit(1.0 / m.m1, service_scv),
+            'service_II': PhaseType.fit(1.0 / m.m2, service_scv),
+        }
+
+    def analyze_phase_type(
+            self,
+            laws: dict[str, PhaseType],
+            solver_method: str = 'auto',
+            tol: float = BalanceEquationsSolver.DEFAULT_TOL
+    ) -> dict[str, Any]:
+        """laws may give any of arrival_I, arrival_II, service_I, service_II; the rest stay exponential."""
+        m = self.model
+        defaults = {
+            'arrival_I': PhaseType.exponential(m.l1),
+            'arrival_II': PhaseType.exponential(m.l2),
+            'service_I': PhaseType.exponential(m.m1),
+            'service_II': PhaseType.exponential(m.m2),
+        }
+        unknown = set(laws) - set(defaults)
+        if unknown:
+            raise ValueError(f"Unknown distributions: {', '.join(sorted(unknown))}.")
+        model = PhaseTypePriorityModel(m.R, **{**defaults, **laws})
+        st = model.state_arrays()
+        solver = BalanceEquationsSolver(
+            generator=model.build_generator(),
+            states=list(zip(*(st[k].tolist() for k in ('i', 'j', 'a1', 'a2', 's')))),
+            levels=model.levels(),
+        )
+        n = model.n_states
+        if solver_method == 'auto':
+            solver_method = solver.default_method(n, structured=True)
+        vector = solver.solve_vector(solver_method, tol=tol)
+        report = model.metrics(vector)
+        report['solver'] = {
+            'method': solver_method,
+            'iterations': solver.iterations,
+            'n_states': n,
+            'residual': solver.residual(vector),
+        }
+        report['laws'] = {name: repr(law) for name, law in {**defaults, **laws}.items()}
+        return report
+
+    def sensitivities(self, include_r: bool = True) -> dict[str, Any]:
+        return SensitivityAnalyzer(self.model).analyze(include_r)
+
+    def transient(
+            self,
+            t_max: float,
+            n_points: int = 50,
+            initial_state: tuple[int, int] = (0, 0),
+            method: str = 'uniformization',
+            steady_state: np.ndarray | None = None
+    ) -> dict[str, Any]:
+        return TransientAnalyzer(self.model, steady_state).analyze(t_max, n_points, initial_state, method)
+
+    def simulate(
+            self,
+            simulation_time: float,
+            seed: int | None = None,
+            trace: TraceRecorder | None = None,
+            laws: dict[str, PhaseType] | None = None
+    ) -> dict:
         simulator = PriorityQueueSimulator(
             r=self.model.R,
             lambda1=self.model.l1,
@@ -40,6 +179,118 @@ class SMOService:
             mu1=self.model.m1,
             mu2=self.model.m2,
             simulation_time=simulation_time,
-            seed=seed
+            seed=seed,
+            trace=trace,
+            **(laws or {})
         )
         return simulator.run()
+
+    def simulate_replications(
+            self,
+            simulation_time: float,
+            replications: int,
+            seed: int | None = None,
+            confidence: float = 0.95
+    ) -> dict[str, Any]:
+        runner = ReplicationRunner(
+            r=self.model.R,
+            lambda1=self.model.l1,
+            lambda2=self.model.l2,
+            mu1=self.model.m1,
+            mu2=self.model.m2,
+            simulation_time=simulation_time,
+            replications=replications,
+            confidence=confidence,
+            seed=seed
+        )
+        return runner.run()
+
+    def compare_paired(
+            self,
+            alternative: dict[str, float],
+            simulation_time: float,
+            replications: int = 10,
+            seed: int | None = None,
+            confidence: float = 0.95
+    ) -> dict[str, Any]:
+        """alternative overrides any of r, lambda1, lambda2, mu1, mu2 of this configuration."""
+        base = {
+            'r': self.model.R,
+            'lambda1': self.model.l1,
+            'lambda2': self.model.l2,
+            'mu1': self.model.m1,
+            'mu2': self.model.m2,
+        }
+        unknown = set(alternative) - set(base)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}.")
+        comparison = PairedComparison(
+            base=base,
+            alternative=alternative,
+            simulation_time=simulation_time,
+            replications=replications,
+            confidence=confidence,
+            seed=seed
+        )
+        return comparison.run()
+
+    def simulate_steady_state(
+            self,
+            relative_precision: float,
+            max_time: float,
+            seed: int | None = None,
+            confidence: float = 0.95,
+            absolute_precision: float = 1e-6
+    ) -> dict[str, Any]:
+        estimator = SteadyStateEstimator(
+            r=self.model.R,
+            lambda1=self.model.l1,
+            lambda2=self.model.l2,
+            mu1=self.model.m1,
+            mu2=self.model.m2,
+            relative_precision=relative_precision,
+            absolute_precision=absolute_precision,
+            confidence=confidence,
+            max_time=max_time,
+            seed=seed
+        )
+        return estimator.run()
+
+    def estimate_rare_blocking(
+            self,
+            cycles: int,
+            seed: int | None = None,
+            confidence: float = 0.95,
+            tilt: float | None = None
+    ) -> dict[str, Any]:
+        i, j = self.model.state_arrays()
+        full = (i + j) == self.model.K
+        if tilt is None:
+            # swapping arrival and service intensities is the classical tilt for overflow of a birth-death chain
+            tilt = max(1.0, min(self.model.m1, self.model.m2) / (self.model.l1 + self.model.l2))
+        estimator = RareEventBlockingEstimator(
+            generator=self.model.build_generator(),
+            levels=i + j,
+            targets={'I': full & (i > 0), 'II': full},
+            tilt=tilt,
+            initial_state=self.model.state_index(0, 0),
+            seed=seed
+        )
+        return estimator.run(cycles, confidence=confidence)
+
+    def simulate_ctmc(self, simulation_time: float, seed: int | None = None) -> dict[str, Any]:
+        run = CTMCSimulator(generator=self.model.build_generator(), seed=seed).run(simulation_time)
+        i, j = self.model.state_arrays()
+        metrics = PerformanceMetrics(
+            run['state_probabilities'], self.model.l1, self.model.l2, self.model.m1, self.model.m2, i=i, j=j
+        )
+        return {
+            'blocking': metrics.blocking_probabilities(),
+            'entrance_intensities': metrics.entrance_intensities(),
+            'served': metrics.served_probabilities(),
+            'average_counts': metrics.average_counts(),
+            'queue_lengths': metrics.average_queue_lengths(),
+            'times': metrics.average_times(),
+            'simulation_time': simulation_time,
+            'sojourns': run['sojourns'],
+        }
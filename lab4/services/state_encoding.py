@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class CompositionRanker:
+    """
+    Лексикографическая нумерация векторов из `parts` неотрицательных целых с суммой ≤ `max_total`.
+
+    Число таких векторов — C(m + k, k); для двух компонент порядок совпадает с
+    BaseQueueModel.state_index (i — старший разряд).
+    """
+
+    def __init__(self, parts: int, max_total: int):
+        if parts < 1 or max_total < 0:
+            raise ValueError("parts must be positive and max_total non-negative")
+        self.parts = parts
+        self.max_total = max_total
+
+        # counts[m + 1, k] = C(m + k, k): vectors of k parts with sum ≤ m; row 0 stands for m = -1
+        counts = np.zeros((max_total + 2, parts + 2), dtype=np.int64)
+        counts[1:, 0] = 1
+        for k in range(1, parts + 2):
+            counts[1:, k] = np.cumsum(counts[1:, k - 1])
+        self._counts = counts
+        self.size = int(counts[max_total + 1, parts])
+
+    def count(self, m: np.ndarray | int, k: int) -> np.ndarray:
+        m = np.asarray(m)
+        return np.where(m < 0, 0, self._counts[np.clip(m, -1, self.max_total) + 1, k])
+
+    def rank(self, vectors: np.ndarray) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.int64)
+        single = v.ndim == 1
+        v = np.atleast_2d(v)
+        remaining = np.full(v.shape[0], self.max_total, dtype=np.int64)
+        ranks = np.zeros(v.shape[0], dtype=np.int64)
+        for p in range(self.parts):
+            k = self.parts - p
+            ranks += self.count(remaining, k) - self.count(remaining - v[:, p], k)
+            remaining -= v[:, p]
+        return ranks[0] if single else ranks
+
+    def vectors(self) -> np.ndarray:
+        result = np.zeros((1, 0), dtype=np.int64)
+        remaining = np.array([self.max_total], dtype=np.int64)
+        for _ in range(self.parts):
+            widths = remaining + 1
+            parent = np.repeat(np.arange(result.shape[0]), widths)
+            offsets = np.cumsum(widths) - widths
+            values = np.arange(parent.size) - np.repeat(offsets, widths)
+            result = np.column_stack((result[parent], values))
+            remaining = remaining[parent] - values
+        return result
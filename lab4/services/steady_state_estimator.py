@@ -0,0 +1,153 @@
+import math
+from typing import Any, Sequence
+
+import numpy as np
+from scipy import stats
+
+from lab4.services.priority_queue_simulator import PriorityQueueSimulator
+
+
+class SteadyStateEstimator:
+    # every metric is a ratio of two accumulated counters, so batches and the warm-up cut stay consistent:
+    # time averages divide an area by elapsed time, blocking divides blocked arrivals by all arrivals
+    METRICS = {
+        'L1': ((0, 2), None),
+        'L2': ((1, 3), None),
+        'Q1': ((2,), None),
+        'Q2': ((3,), None),
+        'blocking_I': ((6,), 4),
+        'blocking_II': ((7,), 5),
+    }
+    MSER_BATCH = 5
+    N_BATCHES = 20
+    MIN_INTERVALS = 200
+
+    def __init__(
+            self,
+            r: int,
+            lambda1: float,
+            lambda2: float,
+            mu1: float,
+            mu2: float,
+            relative_precision: float = 0.02,
+            absolute_precision: float = 1e-6,
+            confidence: float = 0.95,
+            max_time: float = 1e6,
+            interval: float | None = None,
+            metrics: Sequence[str] | None = None,
+            seed: int | None = None
+    ):
+        if not 0 < relative_precision < 1:
+            raise ValueError("Relative precision must be in (0, 1).")
+        if absolute_precision < 0:
+            raise ValueError("Absolute precision must be >= 0.")
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence level must be in (0, 1).")
+        self.metrics = tuple(metrics or self.METRICS)
+        unknown = set(self.metrics) - set(self.METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}.")
+        self.relative_precision = relative_precision
+        # only means that are essentially zero (Q at R=0, blocking under light load) may converge on the
+        # half-width alone; every other metric must reach the relative target
+        self.absolute_precision = absolute_precision
+        self.confidence = confidence
+        self.max_time = max_time
+        # by default an observation interval spans about 20 arrivals
+        self.interval = interval or 20.0 / (lambda1 + lambda2)
+        self.simulator = PriorityQueueSimulator(r, lambda1, lambda2, mu1, mu2, simulation_time=max_time, seed=seed)
+
+    @staticmethod
+    def mser5(values: np.ndarray) -> int:
+        """Warm-up length (in observations) minimising the MSER statistic over batches of five, searched in the first half."""
+        m = values.size // SteadyStateEstimator.MSER_BATCH
+        if m < 4:
+            return 0
+        batches = values[:m * SteadyStateEstimator.MSER_BATCH].reshape(m, -1).mean(axis=1)
+        suffix_sum = np.cumsum(batches[::-1])[::-1]
+        suffix_sq = np.cumsum((batches ** 2)[::-1])[::-1]
+        remaining = np.arange(m, 0, -1)
+        sse = suffix_sq - suffix_sum ** 2 / remaining
+        statistic = sse / remaining ** 2
+        d = int(np.argmin(statistic[:m // 2 + 1]))
+        return d * SteadyStateEstimator.MSER_BATCH
+
+    def _ratio_series(self, increments: np.ndarray, name: str) -> tuple[np.ndarray, np.ndarray]:
+        numerator_cols, denominator_col = self.METRICS[name]
+        numerator = increments[:, list(numerator_cols)].sum(axis=1)
+        if denominator_col is None:
+            denominator = np.full(increments.shape[0], self.interval)
+        else:
+            denominator = increments[:, denominator_col]
+        return numerator, denominator
+
+    def _batch_means(self, numerator: np.ndarray, denominator: np.ndarray) -> tuple[float, float]:
+        size = numerator.size // self.N_BATCHES
+        used = size * self.N_BATCHES
+        num = numerator[-used:].reshape(self.N_BATCHES, size).sum(axis=1)
+        den = denominator[-used:].reshape(self.N_BATCHES, size).sum(axis=1)
+        total = float(den.sum())
+        mean = float(num.sum()) / total if total > 0 else 0.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            batch_values = np.where(den > 0, num / den, mean)
+        t_quantile = float(stats.t.ppf((1 + self.confidence) / 2, self.N_BATCHES - 1))
+        half_width = t_quantile * float(batch_values.std(ddof=1)) / math.sqrt(self.N_BATCHES)
+        return mean, half_width
+
+    def _estimate(self, increments: np.ndarray) -> tuple[int, dict[str, dict[str, float]]]:
+        warmup = 0
+        for name in self.metrics:
+            numerator, denominator = self._ratio_series(increments, name)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = np.where(denominator > 0, numerator / denominator, 0.0)
+            warmup = max(warmup, self.mser5(ratios))
+
+        estimates = {}
+        for name in self.metrics:
+            numerator, denominator = self._ratio_series(increments[warmup:], name)
+            mean, half_width = self._batch_means(numerator, denominator)
+            if mean != 0:
+                relative = half_width / abs(mean)
+            else:
+                relative = 0.0 if half_width == 0 else math.inf
+            estimates[name] = {
+                'mean': mean,
+                'half_width': half_width,
+                'relative_precision': relative,
+                'converged': relative <= self.relative_precision or (
+                    abs(mean) <= self.absolute_precision and half_width <= self.absolute_precision
+                ),
+            }
+        return warmup, estimates
+
+    def run(self) -> dict[str, Any]:
+        snapshots = [self.simulator.counters()]
+        now = 0.0
+        target_intervals = self.MIN_INTERVALS
+        max_intervals = int(self.max_time // self.interval)
+        converged = False
+
+        while True:
+            while len(snapshots) - 1 < min(target_intervals, max_intervals):
+                now += self.interval
+                self.simulator.advance(now)
+                snapshots.append(self.simulator.counters())
+
+            increments = np.diff(np.array(snapshots, dtype=float), axis=0)
+            warmup, estimates = self._estimate(increments)
+            converged = all(e['converged'] for e in estimates.values())
+            if converged or len(snapshots) - 1 >= max_intervals:
+                break
+            # grow geometrically so the number of MSER/batch-means passes stays logarithmic
+            target_intervals = int(target_intervals * 1.5)
+
+        return {
+            'metrics': estimates,
+            'converged': converged,
+            'warmup_time': warmup * self.interval,
+            'simulation_time': now,
+            'interval': self.interval,
+            'relative_precision': self.relative_precision,
+            'absolute_precision': self.absolute_precision,
+            'confidence': self.confidence,
+        }
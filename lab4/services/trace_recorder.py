@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+import numpy as np
+
+
+class TraceRecorder:
+    """
+    Журнал событий имитации: (time, type, i, j) после каждого события.
+
+    Записи копируются порциями в заранее выделенный структурированный массив; когда он заполнен,
+    массив дописывается в файл, и итоговый журнал читается через np.memmap.
+    Файл сброса удаляется в close() (или при выходе из блока with).
+    """
+
+    DTYPE = np.dtype([('time', 'f8'), ('type', 'i1'), ('i', 'i4'), ('j', 'i4')])
+    CHUNK = 4096
+
+    def __init__(self, capacity: int = 1 << 20, spill_path: str | None = None):
+        if capacity < self.CHUNK:
+            raise ValueError(f"capacity must be at least {self.CHUNK} records")
+        self.capacity = capacity - capacity % self.CHUNK
+        self.spill_path = spill_path
+        self._buffer = np.empty(self.capacity, dtype=self.DTYPE)
+        self._size = 0
+        self._pending: list[tuple[float, int, int, int]] = []
+        self.spilled = 0
+
+    def record(self, time: float, kind: int, i: int, j: int) -> None:
+        self._pending.append((time, kind, i, j))
+        if len(self._pending) == self.CHUNK:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        m = len(self._pending)
+        if self._size + m > self.capacity:
+            self._spill()
+        self._buffer[self._size:self._size + m] = self._pending
+        self._size += m
+        self._pending.clear()
+
+    def _spill(self) -> None:
+        if self.spill_path is None:
+            handle, self.spill_path = tempfile.mkstemp(suffix='.trace')
+            os.close(handle)
+            mode = 'wb'
+        else:
+            mode = 'ab' if self.spilled else 'wb'
+        with open(self.spill_path, mode) as f:
+            self._buffer[:self._size].tofile(f)
+        self.spilled += self._size
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self.spilled + self._size + len(self._pending)
+
+    def events(self) -> np.ndarray:
+        """Все записи: копия буфера для коротких прогонов или memmap файла, если буфер сбрасывался."""
+        if self._pending:
+            self._flush_pending()
+        if not self.spilled:
+            return self._buffer[:self._size].copy()
+        if self._size:
+            self._spill()
+        return np.memmap(self.spill_path, dtype=self.DTYPE, mode='r', shape=(self.spilled,))
+
+    def close(self) -> None:
+        if self.spilled and self.spill_path is not None and os.path.exists(self.spill_path):
+            os.unlink(self.spill_path)
+        self.spilled = 0
+        self._size = 0
+        self._pending.clear()
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
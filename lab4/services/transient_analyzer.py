@@ -0,0 +1,162 @@
+from typing import Any
+
+import numpy as np
+from scipy import sparse, stats
+from scipy.sparse import linalg as splinalg
+
+from lab4.services.balance_equations_solver import BalanceEquationsSolver
+from lab4.services.priority_queue_model import PriorityQueueModel
+
+
+class TransientAnalyzer:
+    METHODS = ('uniformization', 'expm_multiply')
+    DEFAULT_EPS = 1e-12
+    # both methods cost about Λ·t products with the generator; past this many nonzeros touched
+    # the remaining time points are given the stationary distribution
+    MAX_WORK = 2e8
+    # an interval that moves P(t) by less than this (L1) means the chain has reached equilibrium
+    STATIONARY_TOL = 1e-12
+
+    def __init__(self, model: PriorityQueueModel, steady_state: np.ndarray | None = None):
+        self.model = model
+        self.generator = model.build_generator()
+        self.i, self.j = model.state_arrays()
+        # an already solved stationary vector saves a second solve when the horizon is cut
+        self.steady_state = steady_state
+
+    def initial_vector(self, initial_state: tuple[int, int] = (0, 0)) -> np.ndarray:
+        i, j = initial_state
+        if i < 0 or j < 0 or i + j > self.model.K:
+            raise ValueError(f"State {initial_state} is outside the state space (i + j ≤ {self.model.K}).")
+        p0 = np.zeros(self.model.n_states)
+        p0[int(self.model.state_index(i, j))] = 1.0
+        return p0
+
+    @staticmethod
+    def _poisson_window(mean: float, eps: float) -> tuple[int, np.ndarray]:
+        # Fox–Glynn style truncation: drop eps/2 of Poisson mass on each side
+        left = int(stats.poisson.ppf(eps / 2, mean))
+        right = max(left, int(stats.poisson.isf(eps / 2, mean)) + 1)
+        weights = stats.poisson.pmf(np.arange(left, right + 1), mean)
+        return left, weights / weights.sum()
+
+    def _rate(self) -> float:
+        return float(np.max(-self.generator.diagonal())) * 1.02
+
+    def work_horizon(self) -> float:
+        """Время, до которого переходное распределение считается честно в пределах MAX_WORK."""
+        return self.MAX_WORK / (self._rate() * self.generator.nnz)
+
+    def _steady_state(self) -> np.ndarray:
+        if self.steady_state is not None:
+            return np.asarray(self.steady_state, dtype=float)
+        levels = self.i + self.j
+        solver = BalanceEquationsSolver(
+            generator=self.generator, states=list(zip(self.i.tolist(), self.j.tolist())), levels=levels
+        )
+        return solver.solve_vector('auto')
+
+    def _uniformization(self, p0: np.ndarray, times: np.ndarray, eps: float) -> np.ndarray:
+        rate = self._rate()
+        n = self.model.n_states
+        step_t = sparse.csr_array((sparse.eye_array(n) + self.generator / rate).T)
+
+        result = np.empty((times.size, n))
+        p, t_prev = p0, 0.0
+        for k, t in enumerate(times):
+            dt = t - t_prev
+            if dt > 0:
+                left, weights = self._poisson_window(rate * dt, eps)
+                v, acc = p, np.zeros(n)
+                for m in range(left + weights.size):
+                    if m >= left:
+                        acc += weights[m - left] * v
+                    v = step_t @ v
+                acc /= acc.sum()
+                if np.abs(acc - p).sum() < self.STATIONARY_TOL:
+                    result[k:] = acc
+                    return result
+                p = acc
+            result[k] = p
+            t_prev = t
+        return result
+
+    def _expm_multiply(self, p0: np.ndarray, times: np.ndarray) -> np.ndarray:
+        q_t = sparse.csc_array(self.generator.T)
+        result = np.empty((times.size, self.model.n_states))
+        p, t_prev = p0, 0.0
+        for k, t in enumerate(times):
+            if t > t_prev:
+                p = np.maximum(splinalg.expm_multiply(q_t * (t - t_prev), p), 0.0)
+                p /= p.sum()
+            result[k] = p
+            t_prev = t
+        return result
+
+    def distribution(
+            self,
+            times: np.ndarray,
+            initial_state: tuple[int, int] = (0, 0),
+            method: str = 'uniformization',
+            eps: float = DEFAULT_EPS
+    ) -> np.ndarray:
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown transient method '{method}'. Choose one of: {', '.join(self.METHODS)}.")
+        times = np.asarray(times, dtype=float)
+        if times.ndim != 1 or np.any(times < 0) or np.any(np.diff(times) < 0):
+            raise ValueError("times must be a non-decreasing sequence of non-negative values.")
+        p0 = self.initial_vector(initial_state)
+        cut = int(np.searchsorted(times, self.work_horizon(), side='right'))
+        if method == 'expm_multiply':
+            result = self._expm_multiply(p0, times[:cut])
+        else:
+            result = self._uniformization(p0, times[:cut], eps)
+        if cut < times.size:
+            result = np.vstack((result, np.tile(self._steady_state(), (times.size - cut, 1))))
+        return result
+
+    def metric_series(self, probs: np.ndarray) -> dict[str, Any]:
+        i, j = self.i, self.j
+        full = (i + j) == self.model.K
+        server_I = i > 0
+        server_II = (i == 0) & (j > 0)
+
+        block_I = probs @ (full & server_I)
+        block_II = probs @ full
+        return {
+            'blocking': {'I': block_I, 'II': block_II},
+            'entrance_intensities': {
+                'lambda1_in': self.model.l1 * (1.0 - block_I),
+                'lambda2_in': self.model.l2 * (1.0 - block_II),
+            },
+            'throughput': {
+                'I': self.model.m1 * (probs @ server_I),
+                'II': self.model.m2 * (probs @ server_II),
+            },
+            'average_counts': {'L1': probs @ i, 'L2': probs @ j},
+            'queue_lengths': {
+                'Q1': probs @ np.maximum(i - 1, 0),
+                'Q2': probs @ np.where(server_I, j, np.maximum(j - 1, 0)),
+            },
+        }
+
+    def analyze(
+            self,
+            t_max: float,
+            n_points: int = 50,
+            initial_state: tuple[int, int] = (0, 0),
+            method: str = 'uniformization',
+            eps: float = DEFAULT_EPS
+    ) -> dict[str, Any]:
+        if t_max <= 0 or n_points < 2:
+            raise ValueError("t_max must be positive and at least two time points are required.")
+        times = np.linspace(0.0, t_max, n_points)
+        probs = self.distribution(times, initial_state, method, eps)
+        horizon = self.work_horizon()
+        return {
+            'times': times,
+            'steady_state_from': float(times[np.searchsorted(times, horizon, side='right')]) if horizon < t_max else None,
+            'initial_state': tuple(initial_state),
+            'method': method,
+            **self.metric_series(probs),
+        }
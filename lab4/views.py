@@ -1,8 +1,12 @@
+from itertools import islice
+
+import numpy as np
 from django.shortcuts import render
 from django.views.generic import TemplateView
 
 from iism.utils import handle_lab_exceptions
 from lab4.forms import PriorityQueueForm
+from lab4.services.replication_runner import ReplicationRunner
 from lab4.services.smo_service import SMOService
 
 
@@ -44,17 +48,92 @@ class Lab4View(TemplateView):
                     mu2=mu2
                 )
 
-                report = service.analyze()
+                solver_method = form.cleaned_data['solver']
+                tolerance = form.cleaned_data['tolerance']
+
+                report = service.analyze(
+                    solver_method=solver_method,
+                    tol=tolerance,
+                    details_page=form.cleaned_data['details_page']
+                )
+                details = report['details']
                 steady_state_probs = report['states']
                 metrics = report['times']
 
                 sim_report = service.simulate(simulation_time=simulation_time, seed=seed)
+                simulated_states = sim_report['state_probabilities']
+                state_distance = 0.5 * sum(abs(v - simulated_states[k]) for k, v in steady_state_probs.items())
+
+                relative_precision = form.cleaned_data.get('relative_precision')
+                sequential = None
+                if relative_precision:
+                    sequential = service.simulate_steady_state(
+                        relative_precision, max_time=100 * simulation_time, seed=seed
+                    )
+
+                arrival_scv = form.cleaned_data.get('arrival_scv')
+                service_scv = form.cleaned_data.get('service_scv')
+                phase_type = None
+                if arrival_scv or service_scv:
+                    laws = service.phase_type_laws(arrival_scv or 1.0, service_scv or 1.0)
+                    ph_report = service.analyze_phase_type(laws, solver_method=solver_method, tol=tolerance)
+                    ph_sim = service.simulate(simulation_time=simulation_time, seed=seed, laws=laws)
+                    phase_type = {
+                        'analytic': ph_report,
+                        'rows': [
+                            {'key': f'{group}: {key}', 'analytic': ph_report[group][key], 'simulated': ph_sim[group][key]}
+                            for group in ('blocking', 'average_counts', 'queue_lengths', 'times')
+                            for key in ph_report[group]
+                        ],
+                    }
+
+                sensitivities = service.sensitivities() if form.cleaned_data.get('sensitivities') else None
+
+                rare_event_cycles = form.cleaned_data.get('rare_event_cycles')
+                rare_event = None
+                if rare_event_cycles:
+                    rare_event = service.estimate_rare_blocking(rare_event_cycles, seed=seed)
+                    for key, row in rare_event['blocking'].items():
+                        row['analytic'] = report['blocking'][key]
+
+                replications = form.cleaned_data['replications']
+                replication_summary = None
+                if replications > 1:
+                    replication_summary = ReplicationRunner.compare(
+                        service.simulate_replications(simulation_time, replications, seed=seed),
+                        report
+                    )
+
+                transient_horizon = form.cleaned_data.get('transient_horizon')
+                transient = None
+                transient_steady_from = None
+                if transient_horizon:
+                    series = service.transient(
+                        transient_horizon,
+                        form.cleaned_data['transient_points'],
+                        steady_state=np.fromiter(steady_state_probs.values(), dtype=float, count=len(steady_state_probs))
+                    )
+                    transient = [
+                        {
+                            'time': float(t),
+                            'block_I': float(series['blocking']['I'][k]),
+                            'block_II': float(series['blocking']['II'][k]),
+                            'L1': float(series['average_counts']['L1'][k]),
+                            'L2': float(series['average_counts']['L2'][k]),
+                        }
+                        for k, t in enumerate(series['times'])
+                    ]
+                    transient_steady_from = series['steady_state_from']
 
                 context['result'] = {
                     'steady_state': [
-                        {'state': str(k), 'probability': round(v, 6)}
-                        for k, v in steady_state_probs.items()
+                        {'state': str(k), 'probability': round(v, 6), 'simulated': simulated_states[k]}
+                        for k, v in islice(
+                            steady_state_probs.items(), details['start'], details['start'] + details['page_size']
+                        )
                     ],
+                    'solver': report['solver'],
+                    'details': details,
                     'metrics': {
                         k: round(v, 6) if v is not None else None
                         for k, v in metrics.items()
@@ -72,9 +151,20 @@ class Lab4View(TemplateView):
                         'mu2': mu2,
                         'simulation_time': simulation_time,
                         'random_seed': seed,
+                        'replications': replications,
+                        'solver': solver_method,
+                        'tolerance': tolerance,
+                        'transient_horizon': transient_horizon,
                     },
-                    'transitions': report['transitions'],
-                    'balance_equations': report['balance_equations'],
+                    'transient': transient,
+                    'transient_steady_from': transient_steady_from,
+                    'replications': replication_summary,
+                    'sequential': sequential,
+                    'rare_event': rare_event,
+                    'sensitivities': sensitivities,
+                    'phase_type': phase_type,
+                    'transitions': list(report['transitions']),
+                    'balance_equations': list(report['balance_equations']),
                     'simulation': {
                         'metrics': {
                             k: round(v, 6) if v is not None else None
@@ -87,6 +177,7 @@ class Lab4View(TemplateView):
                         'queue_lengths': sim_report['queue_lengths'],
                         'simulation_time': simulation_time,
                         'arrivals': sim_report['arrivals'],
+                        'state_distance': state_distance,
                     },
                     'comparison': {
                         'metrics': {
@@ -1,3 +1,6 @@
+from functools import cached_property
+
+from lab5.services.coverability import MinimalCoverabilitySet
 from lab5.services.graph_builder import ReachabilityGraphBuilder
 from lab5.services.marking import Marking
 from lab5.services.petri_net import PetriNet
@@ -8,23 +11,36 @@ class PetriNetAnalyzer:
         self.net = petri_net
         builder = ReachabilityGraphBuilder(petri_net)
         self.graph = builder.build()
+        self.truncated = builder.truncated
+        self.coverability_complete = not self.truncated
         self.all_markings = list(self.graph.keys())
 
-    def is_bounded(self) -> bool:
-        for m in self.all_markings:
-            if "ω" in m.values:
-                return False
-        return True
+    @cached_property
+    def covering_markings(self) -> list[Marking]:
+        # a complete coverability graph is exact; when MAX_MARKINGS cut it short, MinCov is computed instead
+        if self.truncated:
+            mincov = MinimalCoverabilitySet(self.net)
+            markings = mincov.build()
+            self.coverability_complete = mincov.complete
+            return markings
+        return self.all_markings
 
-    def is_safe(self) -> bool:
-        for m in self.all_markings:
-            if any(v != "ω" and v > 1 for v in m.values):
-                return False
-        return True
+    def is_bounded(self) -> bool | None:
+        """None — MinCov исчерпал свой лимит, не найдя ω."""
+        if any("ω" in m.values for m in self.covering_markings):
+            return False
+        return True if self.coverability_complete else None
 
-    def is_conservative(self) -> bool:
-        if not self.is_bounded():
+    def is_safe(self) -> bool | None:
+        # every generalized marking found is a limit of reachable ones, so a violation is final even in a partial set
+        if any(any(v == "ω" or v > 1 for v in m.values) for m in self.covering_markings):
             return False
+        return True if self.coverability_complete else None
+
+    def is_conservative(self) -> bool | None:
+        bounded = self.is_bounded()
+        if not bounded:
+            return bounded
         sums = set()
         for m in self.all_markings:
             s = sum(v for v in m.values if v != "ω")
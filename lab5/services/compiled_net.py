@@ -0,0 +1,112 @@
+import numpy as np
+
+from lab5.services.marking import Marking
+from lab5.services.types import PlaceName, TransitionName
+
+
+class CompiledNet:
+    """
+    Матричное представление сети: pre/post — кратности дуг (переход × место), C = post - pre.
+
+    Разметка — вектор int64, ω кодируется значением OMEGA, которое больше любой достижимой конечной разметки,
+    поэтому покрытие и разрешённость сводятся к обычным сравнениям векторов. При срабатывании места с ω не меняются.
+    """
+
+    OMEGA = np.int64(1 << 62)
+
+    def __init__(
+            self,
+            places: tuple[PlaceName, ...],
+            transitions: tuple[TransitionName, ...],
+            input_arcs: dict[TransitionName, list[PlaceName]],
+            output_arcs: dict[TransitionName, list[PlaceName]]
+    ):
+        self.places = places
+        self.transitions = transitions
+        place_index = {p: k for k, p in enumerate(places)}
+        self.transition_index = {t: k for k, t in enumerate(transitions)}
+        self.pre = np.zeros((len(transitions), len(places)), dtype=np.int64)
+        self.post = np.zeros_like(self.pre)
+        for arcs, matrix in ((input_arcs, self.pre), (output_arcs, self.post)):
+            for t, plist in arcs.items():
+                for p in plist:
+                    matrix[self.transition_index[t], place_index[p]] += 1
+        self.incidence = self.post - self.pre
+
+    def vector(self, marking: Marking) -> np.ndarray:
+        return np.array([self.OMEGA if v == "ω" else v for v in marking.values], dtype=np.int64)
+
+    def marking(self, vector: np.ndarray) -> Marking:
+        values = tuple("ω" if v >= self.OMEGA else v for v in vector.tolist())
+        return Marking(values=values, place_order=self.places)
+
+    def enabled(self, vector: np.ndarray) -> np.ndarray:
+        """Маска разрешённых переходов одним сравнением pre ≤ M по всем переходам."""
+        return np.all(self.pre <= vector, axis=1)
+
+    def fire(self, vector: np.ndarray, transition: int) -> np.ndarray:
+        return np.where(vector >= self.OMEGA, self.OMEGA, vector + self.incidence[transition])
+
+    def successors(self, vector: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Индексы разрешённых переходов и строки с разметками после каждого из них."""
+        enabled = np.flatnonzero(self.enabled(vector))
+        nxt = vector + self.incidence[enabled]
+        nxt[:, vector >= self.OMEGA] = self.OMEGA
+        return enabled, nxt
+
+    def accelerate(self, ancestors: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Ускорение Карпа–Миллера по цепочке предков: если предок M' строго покрыт кандидатом M,
+        места с M'(p) < M(p) получают ω. Проверка векторная сразу для всех кандидатов и предков;
+        повторяется, пока новые ω открывают новых покрытых предков.
+        """
+        while True:
+            less = ancestors[None, :, :] < candidates[:, None, :]
+            covered = np.all(less | (ancestors[None, :, :] == candidates[:, None, :]), axis=2) & np.any(less, axis=2)
+            if not covered.any():
+                return candidates
+            pump = np.any(covered[:, :, None] & less, axis=1)
+            updated = np.where(pump, self.OMEGA, candidates)
+            if np.array_equal(updated, candidates):
+                return candidates
+            candidates = updated
+
+    def finite_sums(self, vectors: np.ndarray) -> np.ndarray:
+        """Сумма конечных компонент каждой строки (ω не учитываются)."""
+        return np.where(vectors >= self.OMEGA, 0, vectors).sum(axis=-1)
+
+    def accelerate_along(
+            self,
+            vectors: np.ndarray,
+            floors: np.ndarray,
+            lows: list[int],
+            parents: list[int],
+            node: int,
+            candidates: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, list[int]]:
+        """
+        Ускорение преемников node по цепочке предков, заданной указателями parents.
+
+        floors[n] — покомпонентный минимум разметок цепочки root … n, lows[n] — минимум их сумм по местам,
+        конечным в n. Строго покрытый предок лежит между floors[node] и кандидатом, а новую ω даёт, только
+        если сумма кандидата больше lows[node]; цепочка обходится лишь для кандидатов, прошедших обе
+        проверки. Возвращает ускоренные разметки и их floors и lows.
+        """
+        sums = self.finite_sums(candidates)
+        new_lows = np.minimum(sums, lows[node])
+        pending = np.flatnonzero((sums > lows[node]) & np.all(candidates >= floors[node], axis=1))
+        if pending.size:
+            chain = [node]
+            while parents[chain[-1]] >= 0:
+                chain.append(parents[chain[-1]])
+            ancestors = vectors[chain]
+            accelerated = self.accelerate(ancestors, candidates[pending])
+            changed = np.any(accelerated != candidates[pending], axis=1)
+            if changed.any():
+                candidates = candidates.copy()
+                # new ω-places drop out of the sums, so the chain minimum is taken again
+                for k, vector in zip(pending[changed].tolist(), accelerated[changed]):
+                    finite = vector < self.OMEGA
+                    candidates[k] = vector
+                    new_lows[k] = min(int(ancestors[:, finite].sum(axis=1).min()), int(vector[finite].sum()))
+        return candidates, np.minimum(candidates, floors[node]), new_lows.tolist()
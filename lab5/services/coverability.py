@@ -0,0 +1,152 @@
+from collections import deque
+from itertools import chain
+
+import numpy as np
+
+from lab5.services.marking import Marking
+from lab5.services.petri_net import PetriNet
+
+
+class MinimalCoverabilitySet:
+    """
+    Минимальное покрывающее множество (MinCov): антицепь обобщённых разметок, нижнее замыкание
+    которой содержит все достижимые разметки.
+
+    Преемники сразу ускоряются по цепочке предков (как у Карпа–Миллера), затем новая разметка
+    отбрасывается, если её покрывает активная, либо вытесняет все строго покрытые ею — их ещё
+    не раскрытые потомки больше не исследуются. Ограниченность и безопасность по результату точны,
+    а памяти нужно порядка размера антицепи, а не всего графа.
+
+    Антицепь разбита на корзины по множеству ω-мест W и сумме конечных фишек t. Разметка из корзины
+    покрывает M, только если t не меньше суммы M вне W, а при равенстве совпадает с M вне W —
+    это проверяется по хешу проекции, так что для консервативных сетей антицепь не просматривается. Число вершин ограничено MAX_NODES; при исчерпании
+    build() возвращает частичный результат и complete = False.
+    """
+
+    MAX_NODES = 100000
+
+    def __init__(self, petri_net: PetriNet, max_nodes: int | None = None):
+        self.net = petri_net
+        self.compiled = petri_net.compiled
+        self.max_nodes = max_nodes or self.MAX_NODES
+        self.complete = False
+        self._vectors = np.empty((64, len(petri_net.places)), dtype=np.int64)
+        self._active = np.zeros(64, dtype=bool)
+        self._floors = np.empty_like(self._vectors)
+        self._parents: list[int] = []
+        self._lows: list[int] = []
+        # ω-mask (bit per place) -> finite token sum -> (nodes, projections onto the finite places);
+        # removed nodes are filtered lazily, their projections stay as they are covered by a live node
+        self._buckets: dict[int, dict[int, tuple[list[int], set[bytes]]]] = {}
+        self._finite: dict[int, np.ndarray] = {}
+        # for the reverse test, per ω-mask M: nodes whose ω-places lie in M, by token sum outside M
+        # and by projection outside M; built when M first appears and extended on every insertion
+        self._below: dict[int, dict[int, tuple[list[int], dict[bytes, list[int]]]]] = {}
+        # every vector ever inserted or rejected is covered by the current antichain
+        self._seen: set[bytes] = set()
+
+    def _signature(self, vector: np.ndarray) -> tuple[int, int]:
+        omega = vector >= self.compiled.OMEGA
+        mask = int.from_bytes(np.packbits(omega, bitorder='little').tobytes(), 'little')
+        self._finite.setdefault(mask, ~omega)
+        return mask, int(vector[~omega].sum())
+
+    def _live(self, groups: list[list[int]]) -> np.ndarray:
+        """Живые вершины из нескольких списков одним массивом; списки с удалёнными вершинами прореживаются."""
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+        index = np.fromiter(chain.from_iterable(groups), dtype=np.int64)
+        live = index[self._active[index]]
+        if 2 * live.size < index.size:
+            for nodes in groups:
+                nodes[:] = [k for k in nodes if self._active[k]]
+        return live
+
+    def _insert(self, vector: np.ndarray, parent: int, floor: np.ndarray, low: int) -> int | None:
+        key = vector.tobytes()
+        if key in self._seen:
+            return None
+        self._seen.add(key)
+        mask, total = self._signature(vector)
+
+        larger: list[list[int]] = []
+        for other_mask, sums in self._buckets.items():
+            if other_mask & mask != mask:
+                continue
+            projected = vector[self._finite[other_mask]]
+            rest = int(projected.sum())
+            for other_total, (nodes, projections) in sums.items():
+                if other_total > rest:
+                    larger.append(nodes)
+                elif other_total == rest and projected.tobytes() in projections:
+                    return None
+        index = self._live(larger)
+        if index.size and np.any(np.all(self._vectors[index] >= vector, axis=1)):
+            return None
+
+        if mask not in self._below:
+            self._below[mask] = {}
+            n = len(self._parents)
+            for other in np.flatnonzero(self._active[:n]).tolist():
+                self._index_below(mask, other)
+        # a marking with the same sum outside M can only be dominated by being equal there
+        projected = vector[self._finite[mask]]
+        smaller: list[list[int]] = []
+        for other_total, (nodes, projections) in self._below[mask].items():
+            if other_total < total:
+                smaller.append(nodes)
+            elif other_total == total:
+                self._active[projections.get(projected.tobytes(), [])] = False
+        index = self._live(smaller)
+        if index.size:
+            self._active[index[np.all(self._vectors[index] <= vector, axis=1)]] = False
+
+        node = len(self._parents)
+        if node == len(self._vectors):
+            self._vectors = np.concatenate((self._vectors, np.empty_like(self._vectors)))
+            self._active = np.concatenate((self._active, np.zeros_like(self._active)))
+            self._floors = np.concatenate((self._floors, np.empty_like(self._floors)))
+        self._vectors[node] = vector
+        self._floors[node] = floor
+        self._active[node] = True
+        self._parents.append(parent)
+        self._lows.append(low)
+        nodes, projections = self._buckets.setdefault(mask, {}).setdefault(total, ([], set()))
+        nodes.append(node)
+        projections.add(vector[self._finite[mask]].tobytes())
+        for other_mask in self._below:
+            if mask & other_mask == mask:
+                self._index_below(other_mask, node)
+        return node
+
+    def _index_below(self, mask: int, node: int) -> None:
+        projected = self._vectors[node][self._finite[mask]]
+        nodes, projections = self._below[mask].setdefault(int(projected.sum()), ([], {}))
+        nodes.append(node)
+        projections.setdefault(projected.tobytes(), []).append(node)
+
+    def build(self) -> list[Marking]:
+        compiled = self.compiled
+        initial = compiled.vector(self.net.initial_marking)
+        root = self._insert(initial, -1, initial, int(compiled.finite_sums(initial)))
+        queue: deque[int] = deque([root])
+
+        while queue and len(self._parents) < self.max_nodes:
+            current = queue.popleft()
+            if not self._active[current]:
+                continue
+            enabled, successors = compiled.successors(self._vectors[current].copy())
+            if not enabled.size:
+                continue
+            # removed ancestors keep their rows, so the parent chain stays valid
+            successors, floors, lows = compiled.accelerate_along(
+                self._vectors, self._floors, self._lows, self._parents, current, successors
+            )
+            for next_vector, floor, low in zip(successors, floors, lows):
+                node = self._insert(next_vector, current, floor, low)
+                if node is not None:
+                    queue.append(node)
+
+        self.complete = not queue
+        n = len(self._parents)
+        return [compiled.marking(v) for v in self._vectors[:n][self._active[:n]]]
@@ -1,5 +1,6 @@
 from collections import deque
 
+import numpy as np
 from django.conf import settings
 
 from lab5.services.marking import Marking
@@ -12,83 +13,70 @@ class ReachabilityGraphBuilder:
 
     def __init__(self, petri_net: PetriNet):
         self.net = petri_net
+        self.compiled = petri_net.compiled
         self.graph: dict[Marking, list[tuple[TransitionName, Marking]]] = {}
         self.omega_nodes: set[Marking] = set()
+        # markings are int64 rows of a growing array, looked up by their bytes
+        self._vectors = np.empty((64, len(petri_net.places)), dtype=np.int64)
+        # per node: componentwise minimum and least finite sum over its chain of parents, see CompiledNet.accelerate_along
+        self._floors = np.empty_like(self._vectors)
+        self._index: dict[bytes, int] = {}
+        self._edges: list[list[tuple[int, int]]] = []
+        self._parents: list[int] = []
+        self._lows: list[int] = []
+        self.truncated = False
+
+    def _add_node(
+            self,
+            vector: np.ndarray,
+            parent: int = -1,
+            floor: np.ndarray | None = None,
+            low: int = 0
+    ) -> tuple[int, bool]:
+        key = vector.tobytes()
+        node = self._index.get(key)
+        if node is not None:
+            return node, False
+        node = len(self._edges)
+        if node == self._vectors.shape[0]:
+            self._vectors = np.concatenate((self._vectors, np.empty_like(self._vectors)))
+            self._floors = np.concatenate((self._floors, np.empty_like(self._floors)))
+        self._vectors[node] = vector
+        self._floors[node] = vector if floor is None else floor
+        self._index[key] = node
+        self._edges.append([])
+        self._parents.append(parent)
+        self._lows.append(low)
+        return node, True
 
     def build(self) -> dict[Marking, list[tuple[TransitionName, Marking]]]:
-        initial = self.net.initial_marking
-        queue: deque[Marking] = deque([initial])
-        visited: set[Marking] = {initial}
-        self.graph = {initial: []}
+        compiled = self.compiled
+        initial = compiled.vector(self.net.initial_marking)
+        root, _ = self._add_node(initial, low=int(compiled.finite_sums(initial)))
+        queue: deque[int] = deque([root])
 
-        while queue and len(self.graph) < self.MAX_MARKINGS:
+        while queue and len(self._edges) < self.MAX_MARKINGS:
             current = queue.popleft()
-            enabled = self.net.enabled_transitions(current)
-
-            for t in enabled:
-                try:
-                    next_mark = self.net.fire(current, t)
-                except ValueError:
-                    continue
-
-                next_mark = self._apply_omega_rules(current, next_mark)
-
-                if next_mark not in self.graph:
-                    self.graph[next_mark] = []
-                    if next_mark not in visited:
-                        visited.add(next_mark)
-                        queue.append(next_mark)
-
-                self.graph[current].append((t, next_mark))
-
-        if len(self.graph) >= self.MAX_MARKINGS:
-            self._mark_unbounded_due_to_limit()
-
+            vector = self._vectors[current].copy()
+            enabled, successors = compiled.successors(vector)
+            if not enabled.size:
+                continue
+            successors, floors, lows = compiled.accelerate_along(
+                self._vectors, self._floors, self._lows, self._parents, current, successors
+            )
+
+            for t, next_vector, floor, low in zip(enabled.tolist(), successors, floors, lows):
+                node, added = self._add_node(next_vector, parent=current, floor=floor, low=low)
+                if added:
+                    queue.append(node)
+                self._edges[current].append((t, node))
+
+        markings = [compiled.marking(v) for v in self._vectors[:len(self._edges)]]
+        self.graph = {
+            markings[k]: [(self.net.transitions[t], markings[dst]) for t, dst in edges]
+            for k, edges in enumerate(self._edges)
+        }
+
+        # a truncated graph says nothing about boundedness; PetriNetAnalyzer falls back to MinimalCoverabilitySet
+        self.truncated = bool(queue)
         return self.graph
-
-    def _mark_unbounded_due_to_limit(self) -> None:
-        initial_vals = self.net.initial_marking.values
-        last_mark = next(reversed(self.graph))
-        all_values_per_place = [[] for _ in initial_vals]
-        for marking in self.graph:
-            for i, val in enumerate(marking.values):
-                if isinstance(val, int):
-                    all_values_per_place[i].append(val)
-        new_vals = []
-        for i, (init_v, last_v) in enumerate(zip(initial_vals, last_mark.values)):
-            if isinstance(last_v, int):
-                if last_v > init_v and last_v > 1:
-                    if all_values_per_place[i] and last_v == max(all_values_per_place[i]):
-                        new_vals.append("ω")
-                    else:
-                        new_vals.append(last_v)
-                else:
-                    new_vals.append(last_v)
-            else:
-                new_vals.append(last_v)
-        unbounded_mark = Marking(tuple(new_vals), last_mark.place_order)
-        self.graph[unbounded_mark] = []
-        for src, edge_list in self.graph.items():
-            self.graph[src] = [
-                (t, unbounded_mark if m == last_mark else m)
-                for t, m in edge_list
-            ]
-
-    def _apply_omega_rules(self, prev: Marking, candidate: Marking) -> Marking:
-        if "ω" in candidate.values:
-            return candidate
-
-        for existing in self.graph:
-            if prev <= existing <= candidate and existing != candidate:
-                new_vals = []
-                for a, b in zip(existing.values, candidate.values):
-                    if isinstance(a, int) and isinstance(b, int):
-                        if b > a:
-                            new_vals.append("ω")
-                        else:
-                            new_vals.append(b)
-                    else:
-                        new_vals.append(b)
-                return Marking(tuple(new_vals), candidate.place_order)
-
-        return candidate
@@ -1,5 +1,9 @@
 from dataclasses import dataclass
+from functools import cached_property
 
+import numpy as np
+
+from lab5.services.compiled_net import CompiledNet
 from lab5.services.marking import Marking
 from lab5.services.types import Arcs, PlaceName, TransitionName
 
@@ -22,34 +26,20 @@ class PetriNet:
                     if p not in all_places:
                         raise ValueError(f"Place {p} not declared")
 
+    @cached_property
+    def compiled(self) -> CompiledNet:
+        return CompiledNet(self.places, self.transitions, self.input_arcs, self.output_arcs)
+
     def enabled_transitions(self, marking: Marking) -> set[TransitionName]:
-        enabled = set()
-        mark_dict = marking.to_dict()
-        for t in self.transitions:
-            inputs = self.input_arcs.get(t, [])
-            satisfied = True
-            for p in inputs:
-                v = mark_dict.get(p, 0)
-                if isinstance(v, int):
-                    if v < 1:
-                        satisfied = False
-                        break
-                elif v == "ω":
-                    continue
-            if satisfied:
-                enabled.add(t)
-        return enabled
+        mask = self.compiled.enabled(self.compiled.vector(marking))
+        return {t for t, on in zip(self.transitions, mask.tolist()) if on}
 
     def fire(self, marking: Marking, transition: TransitionName) -> Marking:
         if transition not in self.transitions:
             raise ValueError(f"Unknown transition: {transition}")
-        if transition not in self.enabled_transitions(marking):
+        compiled = self.compiled
+        vector = compiled.vector(marking)
+        t = compiled.transition_index[transition]
+        if not np.all(compiled.pre[t] <= vector):
             raise ValueError(f"Transition {transition} is not enabled in {marking}")
-
-        mark_dict = marking.to_dict()
-        for p in self.input_arcs.get(transition, []):
-            mark_dict[p] = mark_dict[p] - 1
-        for p in self.output_arcs.get(transition, []):
-            mark_dict[p] = mark_dict.get(p, 0) + 1
-
-        return Marking.from_dict(mark_dict, self.places)
+        return compiled.marking(compiled.fire(vector, t))